@@ -1,10 +1,35 @@
+from __future__ import annotations
+import time
+
+STARTUP_TIME = time.perf_counter()
+
 from tkinter import Tk, Image, Label, Button, Canvas, Frame, BOTTOM, Scale, HORIZONTAL
+from functools import cached_property
+from typing import TYPE_CHECKING
 from PIL import Image
 from project.modules.guiUtils import GuiUtils
-from project.modules.screenshotService import ScreenshotService as ScreenshotService
-from project.modules.scannerService import ScannerService
-from pynput import mouse
-import numpy as np
+import argparse
+import importlib
+import json
+import logging
+import os
+import queue
+import threading
+
+if TYPE_CHECKING:
+    from project.modules.sessionRecorder import SessionRecorder
+    from pynput import mouse
+
+RESOURCES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources')
+WARM_UP_MODULES = ('numpy', 'cv2', 'mss', 'pynput.mouse', 'project.modules.scannerService',
+                   'project.modules.screenshotService')  # imported in the background after the window is shown
+CAPTURE_SIZE = (1920, 1080)  # resolution requested from the camera
+FRAME_SIZE = (1920, 1080)  # resolution the camera frames are processed at, lower it on slow machines
+RECORDINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings')  # edit session recordings
+BROADCAST_ADDRESS = ('127.0.0.1', 8080)  # MJPEG server address, use 0.0.0.0 to reach viewers on the network
+SELECTION_REFRESH = 16  # ms between two redraws of the crop selection, about one display frame
+
+logger = logging.getLogger(__name__)
 
 
 class GUI:
@@ -38,20 +63,80 @@ class GUI:
         isSelectionStarted: bool
             Status of selection (default False)
         colorValues: [array, array]
-            values of configured colors(default np.load('./resources/colors.npy'))
+            values of configured colors, loaded on first use(default np.load(RESOURCES_PATH/colors.npy))
         screenshotService: ScreenshotService
-            class responsible for taking screenshots(default ScreenshotService)
+            class responsible for taking screenshots, created on first use(default ScreenshotService)
+        camera: CameraService | SessionPlayer
+            webcam or replayed recording, opened once the modules are warm(default CameraService at CAPTURE_SIZE)
+        recorder: SessionRecorder | None
+            recorder of the running edit session(default None)
+        broadcast: BroadcastService
+            MJPEG server streaming the edited image, created on first use(default BroadcastService)
         scannerService: ScannerService
-            class of camera scanner(default ScannerService)
-        mouseListener: mouse.Listener
-            class responsible for mouse inputs(default mouseListener)
+            camera scanner at FRAME_SIZE drawing at screen size, created on first use(default ScannerService)
+        mouseListener: mouse.Listener | None
+            class responsible for mouse inputs(default None)
+        selectionEvents: queue.SimpleQueue
+            mouse events passed from the listener thread to the Tk thread(default queue.SimpleQueue())
+        sliders: list[Scale]
+            sliders of the lower and higher HSV color values(default [])
+        sampleStart: tuple[int, int]
+            Preview cords where the color sample selection started(default (0, 0))
+        controlsFrame: Frame | None
+            Button and slider bar of the default layout(default None)
+        metrics: MetricsService
+            registry of loop timings, enabled by LIVESCANNER_METRICS_CSV or F3, created on first use
+        showOverlay: bool
+            Status of the performance overlay(default False)
+        activeDelay: int
+            Edit loop interval in ms while the scene is moving(default 10)
+        idleDelay: int
+            Edit loop interval in ms while the scene is still(default 100)
+        replayPath: str | None
+            Recording replayed instead of the camera(default None)
+        startupTimes: dict[str, float]
+            Milliseconds from process start to each startup step(default {})
+        warmUpThread: threading.Thread
+            Thread importing WARM_UP_MODULES after the window is shown
 
         Methods
         -------
+        onFirstMap(self, event):
+            Records the time to first window and starts warming up
+        warmUp(self):
+            Imports the heavy modules in the background
+        finishStartup(self):
+            Applies the loaded colors and opens the camera once the modules are warm
+        reportStartup(self):
+            Logs the startup timing report
+        setSliderValues(self):
+            Moves the sliders to the configured colors
         updateScreenshotSize(self, event):
             Sets new screenshot size after resizing of window
+        toggleOverlay(self, event):
+            Shows or hides the performance overlay
+        onClose(self):
+            Releases the camera and closes the window
+        startRecord(self, button: Button):
+            Starts recording camera frames and tracking results
+        stopRecord(self, button: Button):
+            Stops recording
+        startBroadcast(self, button: Button):
+            Starts streaming the edited image over HTTP
+        stopBroadcast(self, button: Button):
+            Stops streaming
         onSliderChange(self, value, position):
             Update colors value after changing slider value
+        getPreviewOffset(self):
+            Returns the offset of the preview image inside the image component
+        getPreviewArea(self):
+            Returns the size available for the preview image in the window
+        getPreviewPosition(self):
+            Returns the position of the calibration preview image inside the image component
+        onSampleStart(self, event):
+            Starts selecting a color sample on the preview
+        onSampleEnd(self, event):
+            Sets the sliders to the color range estimated from the selected sample
         saveConfig(self):
             Saves values of sliders to file
         createDefaultLayout(self):
@@ -64,6 +149,10 @@ class GUI:
             On mouse move
         onMouseClick(self, mouse_position_x: int, mouse_position_y: int, button: mouse.Button, is_pressed: bool):
             On mouse click event
+        drainSelection(self):
+            Applies queued mouse events and redraws the selection
+        finishSelection(self, xPos: int, yPos: int):
+            Takes the screenshot of the selected area
         takeACropScreenshot(self):
             Takes cropped screenshot and displays it on layout
         loadImage(self):
@@ -82,7 +171,13 @@ class GUI:
             Loop responsible for configuring colors
         """
 
-    def __init__(self):
+    def __init__(self, replayPath: str | None = None):
+        """
+        :param replayPath:
+            Recording replayed instead of the camera(default None)
+        """
+
+        self.startupTimes: dict[str, float] = {'imports': (time.perf_counter() - STARTUP_TIME) * 1000}
         self.window: Tk = Tk()
         self.windowSize: tuple[int, int] = \
             (int(1800 * GuiUtils.getScreenScale(self.window)), int(1400 * GuiUtils.getScreenScale(self.window)))
@@ -99,16 +194,125 @@ class GUI:
         self.isMousePressed: bool = False
         self.isSelectionStarted: bool = False
 
-        self.colorValues: [np.array, np.array] = np.load('resources/colors.npy')
-        self.screenshotService: ScreenshotService = ScreenshotService(self.window, self.imageComponent)
-        self.scannerService: ScannerService = ScannerService(self.colorValues)
-        self.mouseListener: mouse.Listener = mouse.Listener()
+        self.showOverlay: bool = False
+        self.activeDelay: int = 10
+        self.idleDelay: int = 100
+        self.replayPath: str | None = replayPath
+        self.recorder: SessionRecorder | None = None
+        self.mouseListener: mouse.Listener | None = None
+        self.warmUpThread: threading.Thread = threading.Thread(target=self.warmUp, name="warm-up", daemon=True)
+        self.selectionEvents: queue.SimpleQueue = queue.SimpleQueue()
+        self.sliders: list[Scale] = []
+        self.sampleStart: tuple[int, int] = (0, 0)
+        self.controlsFrame: Frame | None = None
 
         self.window.title("Live scanner")
         self.window.bind('<Configure>', self.updateScreenshotSize)
+        self.window.bind('<F3>', self.toggleOverlay)
+        self.window.bind('<Map>', self.onFirstMap)
+        self.window.protocol("WM_DELETE_WINDOW", self.onClose)
         self.createDefaultLayout()
         self.window.mainloop()
 
+    @cached_property
+    def colorValues(self):
+        """Color values of the pen, loaded from RESOURCES_PATH on first use"""
+
+        import numpy as np
+        return np.load(os.path.join(RESOURCES_PATH, 'colors.npy'))
+
+    @cached_property
+    def metrics(self):
+        """Registry of loop timings, created on first use"""
+
+        from project.modules.metricsService import MetricsService
+        return MetricsService(enabled='LIVESCANNER_METRICS_CSV' in os.environ,
+                              dumpPath=os.environ.get('LIVESCANNER_METRICS_CSV'))
+
+    @cached_property
+    def screenshotService(self):
+        """Service taking screenshots, created on first use"""
+
+        from project.modules.screenshotService import ScreenshotService
+        return ScreenshotService(self.window, self.imageComponent)
+
+    @cached_property
+    def camera(self):
+        """Webcam or replayed recording, created on first use"""
+
+        if self.replayPath:
+            from project.modules.sessionRecorder import SessionPlayer
+            return SessionPlayer(self.replayPath)
+
+        from project.modules.cameraService import CameraService
+        return CameraService(frameWidth=CAPTURE_SIZE[0], frameHeight=CAPTURE_SIZE[1])
+
+    @cached_property
+    def scannerService(self):
+        """Camera scanner, created on first use"""
+
+        from project.modules.scannerService import ScannerService
+        return ScannerService(self.colorValues, self.metrics, self.camera, FRAME_SIZE, GuiUtils.getScreenSize())
+
+    @cached_property
+    def broadcast(self):
+        """MJPEG server, created on first use"""
+
+        from project.modules.broadcastService import BroadcastService
+        return BroadcastService(*BROADCAST_ADDRESS)
+
+    def onFirstMap(self, event: {}):
+        """Records the time to first window and starts importing the heavy modules in the background
+
+                Parameters
+                ----------
+                :param event: dict
+                    Passed by default
+        """
+
+        if event.widget is not self.window or 'window' in self.startupTimes:
+            return
+
+        self.startupTimes['window'] = (time.perf_counter() - STARTUP_TIME) * 1000
+        self.warmUpThread.start()
+        self.window.after(20, self.finishStartup)
+
+    def warmUp(self):
+        """Imports the heavy modules in the background, runs on the warm-up thread."""
+
+        for module in WARM_UP_MODULES:
+            importlib.import_module(module)
+
+    def finishStartup(self):
+        """Applies the loaded colors and opens the camera once the warm-up thread finished."""
+
+        if self.warmUpThread.is_alive():
+            self.window.after(20, self.finishStartup)
+            return
+
+        self.startupTimes['modules'] = (time.perf_counter() - STARTUP_TIME) * 1000
+        self.setSliderValues()
+        self.camera.open()
+        self.startupTimes['ready'] = (time.perf_counter() - STARTUP_TIME) * 1000
+        self.reportStartup()
+
+    def reportStartup(self):
+        """Logs the startup timing report and appends it to LIVESCANNER_STARTUP_LOG when it is set."""
+
+        logger.info("Startup: %s", ", ".join(f"{step} {ms:.0f} ms" for step, ms in self.startupTimes.items()))
+
+        path = os.environ.get('LIVESCANNER_STARTUP_LOG')
+        if path is not None:
+            with open(path, 'a') as file:
+                file.write(json.dumps({'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                                       **{step: round(ms, 1) for step, ms in self.startupTimes.items()}}) + "\n")
+
+    def setSliderValues(self):
+        """Moves the sliders to the configured colors."""
+
+        for slider, value in zip(self.sliders, (*self.colorValues[0], *self.colorValues[1])):
+            slider.set(int(value))
+
     def updateScreenshotSize(self, event: {}):
         """Updates displayed screenshot size according to window size
 
@@ -124,6 +328,32 @@ class GUI:
                                                    self.imageComponent.winfo_height())
             GuiUtils.changeImage(img, self.imageComponent)
 
+    def toggleOverlay(self, event: {}):
+        """Shows or hides the performance overlay, metrics are collected while it is shown
+
+                Parameters
+                ----------
+                :param event: dict
+                    Passed by default
+        """
+
+        self.showOverlay = not self.showOverlay
+        self.metrics.enabled = self.showOverlay or self.metrics.dumpPath is not None
+        self.metrics.reset()
+
+    def onClose(self):
+        """Stops the loops, releases the camera and closes the window."""
+
+        self.editLoopStopper = True
+        self.configLoopStopper = True
+        if self.recorder is not None:
+            self.recorder.stop()
+        if 'broadcast' in vars(self):
+            self.broadcast.stop()
+        if 'camera' in vars(self):
+            self.camera.close()
+        self.window.destroy()
+
     def onSliderChange(self, value, position):
         """Updates color values based on slider change
 
@@ -135,15 +365,96 @@ class GUI:
                             Position/index of the slider
         """
 
-        if position < 3:
-            self.colorValues[0][position] = value
-        else:
-            self.colorValues[1][position - 3] = value
+        values = self.colorValues[0] if position < 3 else self.colorValues[1]
+        value = int(float(value))
+        if values[position % 3] != value:
+            values[position % 3] = value
+
+    def getPreviewOffset(self):
+        """Returns the offset of the preview image inside the image component
+
+                Returns
+                -------
+                :return: int
+                    Width of the border and highlight around the image
+        """
+
+        return int(self.imageComponent.cget('highlightthickness')) + int(self.imageComponent.cget('borderwidth'))
+
+    def getPreviewArea(self):
+        """Returns the size available for the preview image in the window
+
+                The size is taken from the window geometry, not from the image component, which
+                shrinks to the last image shown.
+
+                Returns
+                -------
+                :return: tuple[int, int]
+                    Width and height of the window without the controls and the preview border
+        """
+
+        offset = 2 * self.getPreviewOffset()
+        controlsHeight = self.controlsFrame.winfo_height() if self.controlsFrame is not None else 0
+        return (max(self.window.winfo_width() - offset, 1),
+                max(self.window.winfo_height() - controlsHeight - offset, 1))
+
+    def getPreviewPosition(self):
+        """Returns the position of the calibration preview image inside the image component
+
+                The image component centres an image smaller than itself, e.g. a camera frame
+                narrower than the preview area, so the margin around it is added to the border.
+
+                Returns
+                -------
+                :return: tuple[int, int]
+                    x and y offset of the top-left preview pixel
+        """
+
+        offset = self.getPreviewOffset()
+        frame = self.scannerService.colorsFrame
+        if frame is None:
+            return offset, offset
+
+        return (offset + max(self.imageComponent.winfo_width() - 2 * offset - frame.shape[1], 0) // 2,
+                offset + max(self.imageComponent.winfo_height() - 2 * offset - frame.shape[0], 0) // 2)
+
+    def onSampleStart(self, event: {}):
+        """Starts selecting a color sample on the calibration preview
+
+                Parameters
+                ----------
+                :param event: dict
+                    Mouse press event on the preview
+        """
+
+        offsetX, offsetY = self.getPreviewPosition()
+        self.sampleStart = (event.x - offsetX, event.y - offsetY)
+
+    def onSampleEnd(self, event: {}):
+        """Sets the sliders to the color range estimated from the selected sample
+
+                Parameters
+                ----------
+                :param event: dict
+                    Mouse release event on the preview
+        """
+
+        offsetX, offsetY = self.getPreviewPosition()
+        colorRange = self.scannerService.estimateColorRange(
+            (self.sampleStart[0], self.sampleStart[1], event.x - offsetX, event.y - offsetY))
+        if colorRange is None:
+            return
+
+        for slider, value in zip(self.sliders, (*colorRange[0], *colorRange[1])):
+            slider.set(int(value))
+        self.colorValues[0][:] = colorRange[0]
+        self.colorValues[1][:] = colorRange[1]
 
     def saveConfig(self):
         """Saves the current color configuration to a file."""
 
-        np.save('./resources/colors', self.colorValues)
+        import numpy as np
+        np.save(os.path.join(RESOURCES_PATH, 'colors'), self.colorValues)
 
     def createDefaultLayout(self):
         """Creates the default layout for the application window."""
@@ -153,6 +464,7 @@ class GUI:
         GuiUtils.centerOnStart(self.window, self.windowSize[0], self.windowSize[1])
         frame: Frame = Frame(self.window)
         frame.pack(side=BOTTOM)
+        self.controlsFrame = frame
 
         self.imageComponent.config(highlightbackground="white", highlightcolor="white", highlightthickness=2)
         self.imageComponent.pack(side="top", fill="x", expand=False)
@@ -182,36 +494,49 @@ class GUI:
         saveConfigButton = Button(frame, width=13, height=3, text="Save Config", command=self.saveConfig)
         saveConfigButton.grid(row=0, column=6, padx=5, pady=5)
 
+        recordButton = Button(frame, width=13, height=1, text="Start Record",
+                              command=lambda: self.startRecord(recordButton))
+        recordButton.grid(row=1, column=3, padx=5, pady=5)
+
+        broadcastButton = Button(frame, width=13, height=1, text="Start Broadcast",
+                                 command=lambda: self.startBroadcast(broadcastButton))
+        broadcastButton.grid(row=1, column=4, padx=5, pady=5)
+
+        self.sliders = []
         s1 = Scale(frame, from_=0, to=179, orient=HORIZONTAL, command=lambda v: self.onSliderChange(v, 0))
-        s1.set(self.colorValues[0][0])
+        self.sliders.append(s1)
         s1.grid(row=0, column=7, padx=5, pady=5)
 
         s2 = Scale(frame, from_=0, to=255, orient=HORIZONTAL, command=lambda v: self.onSliderChange(v, 1))
-        s2.set(self.colorValues[0][1])
+        self.sliders.append(s2)
         s2.grid(row=1, column=7, padx=5, pady=5)
 
         s3 = Scale(frame, from_=0, to=255, orient=HORIZONTAL, command=lambda v: self.onSliderChange(v, 2))
-        s3.set(self.colorValues[0][2])
+        self.sliders.append(s3)
         s3.grid(row=0, column=8, padx=5, pady=5)
 
         s4 = Scale(frame, from_=0, to=179, orient=HORIZONTAL, command=lambda v: self.onSliderChange(v, 3))
-        s4.set(self.colorValues[1][0])
+        self.sliders.append(s4)
         s4.grid(row=1, column=8, padx=5, pady=5)
 
         s5 = Scale(frame, from_=0, to=255, orient=HORIZONTAL, command=lambda v: self.onSliderChange(v, 4))
-        s5.set(self.colorValues[1][1])
+        self.sliders.append(s5)
         s5.grid(row=0, column=9, padx=5, pady=5)
 
         s6 = Scale(frame, from_=0, to=255, orient=HORIZONTAL, command=lambda v: self.onSliderChange(v, 5))
-        s6.set(self.colorValues[1][2])
+        self.sliders.append(s6)
         s6.grid(row=1, column=9, padx=5, pady=5)
 
+        if 'colorValues' in vars(self):
+            self.setSliderValues()
+
         self.window.config(bg="systemWindowBackgroundColor")
         self.window.attributes("-alpha", 1)
 
     def startMouseEvent(self):
         """Starts listening to mouse events."""
 
+        from pynput import mouse
         self.mouseListener = mouse.Listener(on_move=self.onMouseMove, on_click=self.onMouseClick)
         self.mouseListener.start()
 
@@ -234,7 +559,7 @@ class GUI:
         GuiUtils.changeImage(self.lastScreenshot, self.imageComponent)
 
     def onMouseMove(self, xPos: int, yPos: int):
-        """Handles the mouse move event for cropping.
+        """Queues the mouse move event for cropping, runs on the listener thread.
 
                         Parameters
                         ----------
@@ -244,19 +569,10 @@ class GUI:
                             Current y-coordinate of the mouse
         """
 
-        if self.isMousePressed:
-            self.cropBackground.coords(self.croppingRect, self.startSelectPosition[0], self.startSelectPosition[1],
-                                       xPos, yPos)
-            self.isSelectionStarted = True
-        elif self.isSelectionStarted:
-            self.isSelectionStarted = False
-            GuiUtils.clearLayout(self.window)
-            self.createDefaultLayout()
-            self.takeAScreenshot(self.startSelectPosition[0], self.startSelectPosition[1], xPos, yPos)
-            self.mouseListener.stop()
+        self.selectionEvents.put(('move', xPos, yPos))
 
     def onMouseClick(self, mouse_position_x: int, mouse_position_y: int, button: mouse.Button, is_pressed: bool):
-        """Handles the mouse click event.
+        """Queues the mouse click event, runs on the listener thread.
 
                        Parameters
                        ----------
@@ -271,10 +587,50 @@ class GUI:
         """
 
         if button == button.left:
-            self.isMousePressed = is_pressed
+            self.selectionEvents.put(('click', mouse_position_x, mouse_position_y, is_pressed))
+
+    def drainSelection(self):
+        """Applies the queued mouse events on the Tk thread and redraws the selection at most once."""
+
+        selectionEnd = None
+        while True:
+            try:
+                event = self.selectionEvents.get_nowait()
+            except queue.Empty:
+                break
+
+            if event[0] == 'click':
+                self.isMousePressed = event[3]
+                if self.isMousePressed:
+                    self.startSelectPosition = (event[1], event[2])
+            elif self.isMousePressed:
+                selectionEnd = (event[1], event[2])
+                self.isSelectionStarted = True
+            elif self.isSelectionStarted:
+                self.finishSelection(event[1], event[2])
+                return
+
+        if selectionEnd is not None:
+            self.cropBackground.coords(self.croppingRect, self.startSelectPosition[0], self.startSelectPosition[1],
+                                       selectionEnd[0], selectionEnd[1])
+        self.window.after(SELECTION_REFRESH, self.drainSelection)
+
+    def finishSelection(self, xPos: int, yPos: int):
+        """Stops listening to the mouse and takes the screenshot of the selected area.
+
+                        Parameters
+                        ----------
+                        :param xPos: int
+                            x-coordinate of the selection end
+                        :param yPos: int
+                            y-coordinate of the selection end
+        """
 
-            if is_pressed:
-                self.startSelectPosition = (mouse_position_x, mouse_position_y)
+        self.isSelectionStarted = False
+        self.mouseListener.stop()
+        GuiUtils.clearLayout(self.window)
+        self.createDefaultLayout()
+        self.takeAScreenshot(self.startSelectPosition[0], self.startSelectPosition[1], xPos, yPos)
 
     def takeACropScreenshot(self):
         """Prepares the interface for taking a cropped screenshot."""
@@ -294,7 +650,9 @@ class GUI:
         self.window.config(bg="white")
         self.window.attributes("-alpha", 0.25)
 
+        self.selectionEvents = queue.SimpleQueue()
         self.startMouseEvent()
+        self.window.after(SELECTION_REFRESH, self.drainSelection)
 
     def loadImage(self):
         """Loads an image from memory."""
@@ -312,6 +670,7 @@ class GUI:
 
         if self.lastScreenshot is not None:
             self.scannerService.startScanner()
+            self.metrics.reset()
             self.editLoopStopper = False
             button.config(text="Stop Edit", command=lambda: self.stopEdit(button))
             self.editLoop()
@@ -330,17 +689,91 @@ class GUI:
         button.config(text="Start Edit", command=lambda: self.startEdit(button))
 
     def editLoop(self):
-        """Continuously updates the image being edited."""
+        """Continuously updates the image being edited, polling slower while the scene is still.
+
+        The image is only redrawn when the composed image changed, while the polling interval
+        follows the motion of the camera scene, so a moving page or a returning pen is picked up
+        at the active rate even before new ink is drawn.
+        """
 
         if self.editLoopStopper is True:
             return
 
-        capturedImage = Image.fromarray(self.scannerService.getFinalImage())
-        mergedImages = Image.fromarray(self.scannerService.mergeImages(self.lastScreenshot, capturedImage))
+        composedImage = self.scannerService.getComposedImage(self.lastScreenshot)
+        if composedImage is None or not self.scannerService.sceneChanged:
+            self.metrics.idle()
+            delay = self.activeDelay if self.scannerService.sceneMoving else self.idleDelay
+            self.imageComponent.after(delay, lambda: self.editLoop())
+            return
+
+        mergedImages = Image.fromarray(composedImage)
         self.lastDisplayedImage = mergedImages
+        if 'broadcast' in vars(self):
+            self.broadcast.publish(mergedImages)
 
-        GuiUtils.changeImage(mergedImages, self.imageComponent)
-        self.imageComponent.after(10, lambda: self.editLoop())
+        with self.metrics.stage('display'):
+            if self.showOverlay:
+                mergedImages = self.metrics.drawOverlay(mergedImages)
+            GuiUtils.changeImage(mergedImages, self.imageComponent)
+        self.scannerService.reportDisplayed()
+        self.metrics.frame()
+        self.imageComponent.after(self.activeDelay, lambda: self.editLoop())
+
+    def startRecord(self, button: Button):
+        """Starts recording camera frames and tracking results of edit sessions to RECORDINGS_PATH.
+
+                        Parameters
+                        ----------
+                        :param button: Button
+                            Element that triggered this function
+        """
+
+        from project.modules.sessionRecorder import SessionRecorder
+        path = os.path.join(RECORDINGS_PATH, time.strftime('session-%Y%m%d-%H%M%S'))
+        self.recorder = SessionRecorder(path)
+        self.recorder.start()
+        self.scannerService.recorder = self.recorder
+        button.config(text="Stop Record", command=lambda: self.stopRecord(button))
+
+    def stopRecord(self, button: Button):
+        """Stops recording and finishes writing the recording.
+
+                        Parameters
+                        ----------
+                        :param button: Button
+                            Element that triggered this function
+        """
+
+        self.scannerService.recorder = None
+        self.recorder.stop()
+        self.recorder = None
+        button.config(text="Start Record", command=lambda: self.startRecord(button))
+
+    def startBroadcast(self, button: Button):
+        """Starts streaming the edited image as MJPEG on BROADCAST_ADDRESS.
+
+                        Parameters
+                        ----------
+                        :param button: Button
+                            Element that triggered this function
+        """
+
+        self.broadcast.start()
+        if self.lastDisplayedImage.width != 0:
+            self.broadcast.publish(self.lastDisplayedImage)
+        button.config(text="Stop Broadcast", command=lambda: self.stopBroadcast(button))
+
+    def stopBroadcast(self, button: Button):
+        """Stops streaming and closes the server.
+
+                        Parameters
+                        ----------
+                        :param button: Button
+                            Element that triggered this function
+        """
+
+        self.broadcast.stop()
+        button.config(text="Start Broadcast", command=lambda: self.startBroadcast(button))
 
     def startColorConfig(self, button: Button):
         """Starts the color configuration loop.
@@ -353,6 +786,8 @@ class GUI:
 
         self.configLoopStopper = False
         self.scannerService.startScanner()
+        self.imageComponent.bind('<ButtonPress-1>', self.onSampleStart)
+        self.imageComponent.bind('<ButtonRelease-1>', self.onSampleEnd)
         button.config(text="Stop Config", command=lambda: self.stopColorConfig(button))
         self.colorConfigLoop()
 
@@ -367,18 +802,27 @@ class GUI:
 
         self.scannerService.stopScanner()
         self.configLoopStopper = True
+        self.imageComponent.unbind('<ButtonPress-1>')
+        self.imageComponent.unbind('<ButtonRelease-1>')
         button.config(text="Start Config", command=lambda: self.startColorConfig(button))
 
     def colorConfigLoop(self):
-        """Continuously updates the image for color configuration."""
+        """Continuously updates the image for color configuration at the size it is displayed at."""
 
         if self.configLoopStopper is True:
             return
 
-        capturedImage = Image.fromarray(self.scannerService.getColorsImage(self.colorValues[0], self.colorValues[1]))
-        GuiUtils.changeImage(capturedImage, self.imageComponent)
+        colorsImage = self.scannerService.getColorsImage(self.colorValues[0], self.colorValues[1],
+                                                         self.getPreviewArea())
+        if colorsImage is not None:
+            GuiUtils.changeImage(Image.fromarray(colorsImage), self.imageComponent)
         self.imageComponent.after(10, lambda: self.colorConfigLoop())
 
 
 if __name__ == "__main__":
-    gui = GUI()
+    parser = argparse.ArgumentParser(description="Draws on screenshots with a pen tracked by the camera.")
+    parser.add_argument('--replay', help="recording directory to replay instead of the camera")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    gui = GUI(args.replay)
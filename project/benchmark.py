@@ -0,0 +1,320 @@
+import argparse
+import json
+import os
+import platform
+import time
+import tracemalloc
+from tkinter import Tk, TclError
+from PIL import Image, ImageTk
+from project.modules.scannerService import ScannerService
+from project.modules.sessionRecorder import SessionPlayer
+import cv2
+import numpy as np
+
+RESOURCES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources')
+FRAME_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frame.jpg')
+RESOLUTIONS = {'720p': (1280, 720), '1080p': (1920, 1080), '4K': (3840, 2160)}
+
+
+class Benchmark:
+    """
+    A class used to measure the ScannerService pipeline stage by stage without a camera or GUI.
+
+    Attributes
+    ----------
+    iterations : int
+        Number of timed runs of every stage (default 50)
+    warmup : int
+        Number of untimed runs before measuring (default 5)
+    resolutions : dict[str, tuple[int, int]]
+        Frame sizes to benchmark, keyed by label (default RESOLUTIONS)
+    colorValues : [array, array]
+        HSV color range for pen detection (default np.load('resources/colors.npy'))
+    tkRoot : Tk or None
+        Hidden Tk root used to measure PhotoImage conversion, None when no display is available
+
+    Methods
+    -------
+    loadFixtures(width: int, height: int):
+        Returns the recorded frame and a synthetic page frame at the given size.
+    syntheticFrame(width: int, height: int):
+        Draws a page with a pen blob on a dark background.
+    getStages(scanner: ScannerService, frame: np.ndarray):
+        Returns the ordered pipeline stages prepared for the given frame.
+    measure(function):
+        Times a stage and returns its latency percentiles, throughput and peak memory.
+    run():
+        Runs every stage for every fixture and resolution.
+    replay(path: str):
+        Feeds a recorded session through the whole pipeline at maximum speed.
+    compare(current: dict, baseline: dict):
+        Returns per-stage p50 ratios between two benchmark results.
+    """
+
+    def __init__(self, iterations: int = 50, warmup: int = 5, resolutions: dict = None):
+        self.iterations: int = iterations
+        self.warmup: int = warmup
+        self.resolutions: dict[str, tuple[int, int]] = resolutions or RESOLUTIONS
+        self.colorValues: [np.array, np.array] = np.load(os.path.join(RESOURCES_PATH, 'colors.npy'))
+
+        try:
+            self.tkRoot: Tk | None = Tk()
+            self.tkRoot.withdraw()
+        except TclError:
+            self.tkRoot = None
+
+    def loadFixtures(self, width: int, height: int):
+        """
+        Returns the recorded frame and a synthetic page frame at the given size.
+
+        Parameters
+        ----------
+        :param width : int
+            Width of the fixtures.
+        :param height : int
+            Height of the fixtures.
+
+        Returns
+        -------
+        :return dict[str, np.ndarray]
+            BGR frames keyed by fixture name.
+        """
+
+        recorded = cv2.resize(cv2.imread(FRAME_PATH), (width, height), interpolation=cv2.INTER_LINEAR)
+        return {'frame.jpg': recorded, 'synthetic': self.syntheticFrame(width, height)}
+
+    @staticmethod
+    def syntheticFrame(width: int, height: int):
+        """
+        Draws a page with a pen blob on a dark background.
+
+        Parameters
+        ----------
+        :param width : int
+            Width of the frame.
+        :param height : int
+            Height of the frame.
+
+        Returns
+        -------
+        :return np.ndarray
+            The synthetic BGR frame.
+        """
+
+        frame = np.full((height, width, 3), 40, dtype=np.uint8)
+        page = np.array([[width * 0.12, height * 0.10], [width * 0.90, height * 0.08],
+                         [width * 0.88, height * 0.92], [width * 0.10, height * 0.90]], dtype=np.int32)
+        cv2.fillPoly(frame, [page], (235, 235, 235))
+        cv2.circle(frame, (width // 2, height // 2), max(height // 60, 10), (255, 0, 0), -1)
+        return frame
+
+    def getStages(self, scanner: ScannerService, frame: np.ndarray):
+        """
+        Returns the ordered pipeline stages prepared for the given frame.
+
+        Every stage receives the output of the previous one computed once up front, so each
+        measurement covers only the work of that stage.
+
+        Parameters
+        ----------
+        :param scanner : ScannerService
+            Scanner configured for the frame size.
+        :param frame : np.ndarray
+            The input BGR frame.
+
+        Returns
+        -------
+        :return list[tuple[str, callable]]
+            Stage names with argument-less callables.
+        """
+
+        height, width = frame.shape[:2]
+        preprocessed = scanner.preProcessing(frame)
+        corners = scanner.getCornerPoints(preprocessed)
+        if not corners.any():
+            corners = np.array([[width, 0], [0, 0], [0, height], [width, height]])
+        page = scanner.selectPage(corners)
+        matrix = scanner.getHomography(page)
+        processed = scanner.rectify(frame, matrix)
+        canvas = np.zeros(processed.shape[:2], dtype=np.uint8)
+        screenshot = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        composed = scanner.mergeImages(screenshot, canvas)
+        merged = Image.fromarray(composed)
+
+        def pen():
+            scanner.canvas = canvas
+            scanner.penCords = (0, 0)
+            return scanner.getPenFromImage(processed)
+
+        stages = [('preProcessing', lambda: scanner.preProcessing(frame)),
+                  ('getCornerPoints', lambda: scanner.getCornerPoints(preprocessed)),
+                  ('getHomography', lambda: scanner.getHomography(page)),
+                  ('rectify', lambda: scanner.rectify(frame, matrix)),
+                  ('getPenFromImage', pen),
+                  ('mergeImages', lambda: scanner.mergeImages(screenshot, canvas)),
+                  ('fromArray', lambda: Image.fromarray(composed))]
+
+        if self.tkRoot is not None:
+            stages.append(('photoImage', lambda: ImageTk.PhotoImage(image=merged, master=self.tkRoot)))
+
+        return stages
+
+    def measure(self, function):
+        """
+        Times a stage and returns its latency percentiles, throughput and peak memory.
+
+        Latencies are measured first with tracing disabled, the peak memory comes from a separate
+        traced pass so the tracemalloc overhead does not distort the timings. Tracing starts right
+        before that pass, so the peak is the memory the stage allocates per run in steady state.
+
+        Parameters
+        ----------
+        :param function : callable
+            The stage to measure.
+
+        Returns
+        -------
+        :return dict
+            Latencies in milliseconds, throughput in runs per second and peak memory in bytes.
+        """
+
+        for _ in range(self.warmup):
+            function()
+
+        latencies = np.empty(self.iterations)
+        for i in range(self.iterations):
+            start = time.perf_counter()
+            function()
+            latencies[i] = time.perf_counter() - start
+
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        function()
+        peakMemory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1000
+        return {'p50': round(float(p50), 4), 'p90': round(float(p90), 4), 'p99': round(float(p99), 4),
+                'mean': round(float(latencies.mean() * 1000), 4),
+                'throughput': round(float(1 / latencies.mean()), 2),
+                'peakMemory': int(peakMemory)}
+
+    def run(self):
+        """
+        Runs every stage for every fixture and resolution.
+
+        Returns
+        -------
+        :return dict
+            Metadata of the run and results keyed by fixture, resolution and stage.
+        """
+
+        results = {}
+        for label, (width, height) in self.resolutions.items():
+            for fixture, frame in self.loadFixtures(width, height).items():
+                scanner = ScannerService(self.colorValues, frameSize=(width, height))
+
+                stageResults = {name: self.measure(function) for name, function in self.getStages(scanner, frame)}
+                results.setdefault(fixture, {})[label] = stageResults
+
+        return {'meta': {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                         'python': platform.python_version(),
+                         'opencv': cv2.__version__,
+                         'numpy': np.__version__,
+                         'machine': platform.machine(),
+                         'iterations': self.iterations},
+                'results': results}
+
+    def replay(self, path: str):
+        """
+        Feeds a recorded session through the whole pipeline at maximum speed.
+
+        Parameters
+        ----------
+        :param path : str
+            Directory of the recording.
+
+        Returns
+        -------
+        :return dict
+            Per-frame latency percentiles and throughput of getFinalImage, including decoding, and
+            the function calls and cache hits of every pipeline stage, only the frame count for an
+            empty recording.
+        """
+
+        player = SessionPlayer(path, realtime=False)
+        if len(player) == 0:
+            return {'frames': 0}
+
+        scanner = ScannerService(self.colorValues, camera=player, frameSize=tuple(player.meta['frameSize']))
+
+        latencies = np.empty(len(player))
+        frames = player.replay(scanner)
+        for i in range(len(player)):
+            start = time.perf_counter()
+            next(frames)
+            latencies[i] = time.perf_counter() - start
+        frames.close()
+
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1000
+        return {'frames': len(player), 'p50': round(float(p50), 4), 'p90': round(float(p90), 4),
+                'p99': round(float(p99), 4), 'throughput': round(float(1 / latencies.mean()), 2),
+                'stages': scanner.pipeline.getStatistics()}
+
+    @staticmethod
+    def compare(current: dict, baseline: dict):
+        """
+        Returns per-stage p50 ratios between two benchmark results.
+
+        Parameters
+        ----------
+        :param current : dict
+            Result of the current run.
+        :param baseline : dict
+            Result of the run to compare against.
+
+        Returns
+        -------
+        :return dict
+            Ratios current/baseline keyed by fixture, resolution and stage, below 1 means faster.
+        """
+
+        ratios = {}
+        for fixture, resolutions in current['results'].items():
+            for label, stages in resolutions.items():
+                for stage, values in stages.items():
+                    old = baseline['results'].get(fixture, {}).get(label, {}).get(stage)
+                    if old and old['p50'] > 0:
+                        ratios.setdefault(fixture, {}).setdefault(label, {})[stage] = \
+                            round(values['p50'] / old['p50'], 3)
+
+        return ratios
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the scanner pipeline stage by stage.")
+    parser.add_argument('--output', default='benchmark.json', help="path of the JSON result")
+    parser.add_argument('--baseline', help="previous JSON result to compare against")
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--resolutions', nargs='+', choices=list(RESOLUTIONS), default=list(RESOLUTIONS))
+    parser.add_argument('--replay', help="recorded session to replay through the whole pipeline")
+    args = parser.parse_args()
+
+    benchmark = Benchmark(args.iterations, resolutions={label: RESOLUTIONS[label] for label in args.resolutions})
+    result = benchmark.run()
+    if args.replay:
+        result['replay'] = benchmark.replay(args.replay)
+        print(f"replay {result['replay']}")
+    if args.baseline:
+        with open(args.baseline) as file:
+            result['comparison'] = Benchmark.compare(result, json.load(file))
+
+    with open(args.output, 'w') as file:
+        json.dump(result, file, indent=2)
+
+    for fixture, resolutions in result['results'].items():
+        for label, stages in resolutions.items():
+            for stage, values in stages.items():
+                print(f"{fixture:10} {label:6} {stage:16} p50 {values['p50']:9.3f} ms  "
+                      f"p99 {values['p99']:9.3f} ms  {values['throughput']:9.1f}/s  "
+                      f"{values['peakMemory'] / 1e6:8.2f} MB")
@@ -0,0 +1,281 @@
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from PIL import Image
+import cv2
+import numpy as np
+
+BOUNDARY = 'livescannerframe'
+
+logger = logging.getLogger(__name__)
+
+
+class BroadcastRequestHandler(BaseHTTPRequestHandler):
+    """
+    A class used to answer the HTTP requests of a BroadcastService.
+
+    Methods
+    -------
+    do_GET():
+        Serves the MJPEG stream on / and /stream and the latest frame on /snapshot.
+    sendSnapshot():
+        Sends the latest frame as a single JPEG.
+    sendStream():
+        Sends every new frame as a part of a multipart MJPEG response until the client leaves.
+    log_message(format, *args):
+        Sends the request log to the module logger.
+    """
+
+    def do_GET(self):
+        """
+        Serves the MJPEG stream on / and /stream and the latest frame on /snapshot.
+        """
+
+        path = self.path.split('?')[0]
+        if path in ('/', '/stream'):
+            self.sendStream()
+        elif path in ('/snapshot', '/snapshot.jpg'):
+            self.sendSnapshot()
+        else:
+            self.send_error(404)
+
+    def sendSnapshot(self):
+        """
+        Sends the latest frame as a single JPEG, 503 before the first frame was published.
+        """
+
+        sequence, jpeg = self.server.broadcast.getFrame()
+        if jpeg is None:
+            self.send_error(503, "No frame published yet")
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(jpeg)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(jpeg)
+
+    def sendStream(self):
+        """
+        Sends every new frame as a part of a multipart MJPEG response until the client leaves.
+
+        A client that is still writing the previous frame skips all frames encoded meanwhile and
+        continues with the latest one.
+        """
+
+        self.send_response(200)
+        self.send_header('Content-Type', f'multipart/x-mixed-replace; boundary={BOUNDARY}')
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+
+        sequence = -1
+        broadcast = self.server.broadcast
+        try:
+            while broadcast.running:
+                sequence, jpeg = broadcast.waitForFrame(sequence, timeout=1.0)
+                if jpeg is None:
+                    continue
+                self.wfile.write(f'--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n'
+                                 f'Content-Length: {len(jpeg)}\r\n\r\n'.encode())
+                self.wfile.write(jpeg)
+                self.wfile.write(b'\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        """
+        Sends the request log to the module logger instead of stderr.
+        """
+
+        logger.debug(format, *args)
+
+
+class BroadcastService:
+    """
+    A class used to stream the composited image as MJPEG over HTTP.
+
+    Published frames are JPEG-encoded once on a worker thread and the same bytes are sent to all
+    clients. Publishing never blocks: a frame replaces the one still waiting for the encoder and
+    clients always continue with the latest encoded frame.
+
+    Attributes
+    ----------
+    host : str
+        Address the server listens on (default '127.0.0.1')
+    port : int
+        Port the server listens on, 0 picks a free one (default 8080)
+    quality : int
+        JPEG quality of the stream (default 80)
+    server : ThreadingHTTPServer or None
+        The HTTP server (default None)
+    running : bool
+        Whether the service is started (default False)
+    condition : threading.Condition
+        Signals new pending and encoded frames
+    pendingFrame : Image or np.ndarray or None
+        Latest published frame not encoded yet, arrays are copies (default None)
+    jpeg : bytes or None
+        Latest encoded frame (default None)
+    sequence : int
+        Number of the latest encoded frame (default 0)
+    threads : list[threading.Thread]
+        Server and encoder threads
+
+    Methods
+    -------
+    start():
+        Starts the server and the encoder.
+    getUrl():
+        Returns the URL of the stream.
+    publish(image):
+        Hands a frame over to the encoder without waiting.
+    encodeLoop():
+        Encodes published frames, runs on the encoder thread.
+    getFrame():
+        Returns the latest encoded frame.
+    waitForFrame(sequence: int, timeout: float):
+        Waits for a frame newer than the given one.
+    stop():
+        Stops the server and the encoder.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8080, quality: int = 80):
+        self.host: str = host
+        self.port: int = port
+        self.quality: int = quality
+        self.server: ThreadingHTTPServer | None = None
+        self.running: bool = False
+        self.condition: threading.Condition = threading.Condition()
+        self.pendingFrame: Image.Image | np.ndarray | None = None
+        self.jpeg: bytes | None = None
+        self.sequence: int = 0
+        self.threads: list[threading.Thread] = []
+
+    def start(self):
+        """
+        Starts the server and the encoder.
+        """
+
+        self.server = ThreadingHTTPServer((self.host, self.port), BroadcastRequestHandler)
+        self.server.daemon_threads = True
+        self.server.broadcast = self
+        self.port = self.server.server_address[1]
+        self.running = True
+
+        self.threads = [threading.Thread(target=self.server.serve_forever, name="broadcast-server", daemon=True),
+                        threading.Thread(target=self.encodeLoop, name="broadcast-encoder", daemon=True)]
+        for thread in self.threads:
+            thread.start()
+        logger.info("Broadcasting on %s", self.getUrl())
+
+    def getUrl(self):
+        """
+        Returns the URL of the stream.
+
+        Returns
+        -------
+        :return str
+            URL of the MJPEG stream, the snapshot is served on /snapshot.
+        """
+
+        return f"http://{self.host}:{self.port}/stream"
+
+    def publish(self, image: Image.Image | np.ndarray):
+        """
+        Hands a frame over to the encoder without waiting.
+
+        PIL images are handed over as they are, arrays are copied since they may be pooled buffers
+        the next frame overwrites while the encoder still reads them.
+
+        Parameters
+        ----------
+        :param image : Image or np.ndarray
+            RGB or RGBA frame, images must not be modified afterwards.
+        """
+
+        if not self.running:
+            return
+
+        if isinstance(image, np.ndarray):
+            image = image.copy()
+        with self.condition:
+            self.pendingFrame = image
+            self.condition.notify_all()
+
+    def encodeLoop(self):
+        """
+        Encodes published frames until the service stops, runs on the encoder thread.
+        """
+
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pendingFrame is not None or not self.running)
+                if not self.running:
+                    return
+                image, self.pendingFrame = self.pendingFrame, None
+
+            frame = np.asarray(image)
+            code = cv2.COLOR_RGBA2BGR if frame.ndim == 3 and frame.shape[2] == 4 else cv2.COLOR_RGB2BGR
+            jpeg = cv2.imencode('.jpg', cv2.cvtColor(frame, code), [cv2.IMWRITE_JPEG_QUALITY, self.quality])[1]
+
+            with self.condition:
+                self.jpeg = jpeg.tobytes()
+                self.sequence += 1
+                self.condition.notify_all()
+
+    def getFrame(self):
+        """
+        Returns the latest encoded frame.
+
+        Returns
+        -------
+        :return tuple[int, bytes or None]
+            Number and JPEG bytes of the frame, None before the first frame.
+        """
+
+        with self.condition:
+            return self.sequence, self.jpeg
+
+    def waitForFrame(self, sequence: int, timeout: float):
+        """
+        Waits for a frame newer than the given one.
+
+        Parameters
+        ----------
+        :param sequence : int
+            Number of the last frame the caller has.
+        :param timeout : float
+            Seconds to wait at most.
+
+        Returns
+        -------
+        :return tuple[int, bytes or None]
+            Number and JPEG bytes of the latest frame, None bytes on timeout or stop.
+        """
+
+        with self.condition:
+            if not self.condition.wait_for(
+                    lambda: (self.sequence != sequence and self.jpeg is not None) or not self.running, timeout):
+                return sequence, None
+            if not self.running:
+                return sequence, None
+            return self.sequence, self.jpeg
+
+    def stop(self):
+        """
+        Stops the server and the encoder.
+        """
+
+        if not self.running:
+            return
+
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+        self.server.shutdown()
+        self.server.server_close()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
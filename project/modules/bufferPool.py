@@ -0,0 +1,57 @@
+import numpy as np
+
+
+class BufferPool:
+    """
+    A class used to reuse named frame-sized arrays between frames.
+
+    A buffer is reallocated only when the requested shape or dtype changes, so at a fixed
+    resolution every frame writes into the arrays allocated for the first one. Arrays returned
+    by get() are overwritten by the next frame and must be copied by callers that keep them.
+
+    Attributes
+    ----------
+    buffers : dict[str, np.ndarray]
+        Allocated buffers keyed by name
+
+    Methods
+    -------
+    get(name: str, shape: tuple, dtype: np.dtype):
+        Returns the buffer of the given name, allocating it when needed.
+    clear():
+        Releases all buffers.
+    """
+
+    def __init__(self):
+        self.buffers: dict[str, np.ndarray] = {}
+
+    def get(self, name: str, shape: tuple, dtype: np.dtype = np.uint8):
+        """
+        Returns the buffer of the given name, allocating it when needed.
+
+        Parameters
+        ----------
+        :param name : str
+            Name of the buffer.
+        :param shape : tuple
+            Required shape of the buffer.
+        :param dtype : np.dtype
+            Required dtype of the buffer (default np.uint8).
+
+        Returns
+        -------
+        :return np.ndarray
+            The buffer, its content is left from the previous frame.
+        """
+
+        buffer = self.buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = self.buffers[name] = np.empty(shape, dtype=dtype)
+        return buffer
+
+    def clear(self):
+        """
+        Releases all buffers.
+        """
+
+        self.buffers.clear()
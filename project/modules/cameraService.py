@@ -0,0 +1,212 @@
+import logging
+import threading
+import time
+import cv2
+
+logger = logging.getLogger(__name__)
+
+
+class CameraService:
+    """
+    A class used to keep the webcam open between scanner sessions.
+
+    The device is opened on a background thread, so starting a session never waits for the
+    camera. It stays open while any session uses it and is released after idleTimeout seconds
+    without users, also when it was opened ahead of the first session, or when the application
+    closes.
+
+    Attributes
+    ----------
+    device : int
+        Index of the capture device (default 0)
+    frameWidth : int
+        Requested width of the camera frames (default 1920)
+    frameHeight : int
+        Requested height of the camera frames (default 1080)
+    idleTimeout : float
+        Seconds the device stays open without users (default 120.0)
+    video : cv2.VideoCapture or None
+        Opened capture device, None while closed or opening (default None)
+    users : int
+        Number of sessions currently using the camera (default 0)
+    lock : threading.Lock
+        Guards video, users and idleTimer against concurrent sessions, reads and the idle release
+    openingThread : threading.Thread or None
+        Thread opening the device (default None)
+    idleTimer : threading.Timer or None
+        Timer closing the device after idleTimeout (default None)
+    frameTime : float
+        perf_counter value when the last frame was read (default 0.0)
+
+    Methods
+    -------
+    open():
+        Starts opening the device in the background unless it is open already.
+    startIdleTimer():
+        Starts the timer releasing the device after idleTimeout.
+    openDevice():
+        Opens and configures the device, runs on the opening thread.
+    isOpened():
+        Returns True once the device can be read.
+    acquire():
+        Registers a session and makes sure the device is opening.
+    release():
+        Unregisters a session, the device is closed after idleTimeout without users.
+    read():
+        Returns the next frame, None while the device is not open.
+    closeIdle():
+        Releases the device unless a session acquired it again.
+    close():
+        Releases the device immediately.
+    """
+
+    def __init__(self, device: int = 0, frameWidth: int = 1920, frameHeight: int = 1080, idleTimeout: float = 120.0):
+        self.device: int = device
+        self.frameWidth: int = frameWidth
+        self.frameHeight: int = frameHeight
+        self.idleTimeout: float = idleTimeout
+        self.video: cv2.VideoCapture | None = None
+        self.users: int = 0
+        self.lock: threading.Lock = threading.Lock()
+        self.openingThread: threading.Thread | None = None
+        self.idleTimer: threading.Timer | None = None
+        self.frameTime: float = 0.0
+
+    def open(self):
+        """
+        Starts opening the device in the background unless it is open or opening already.
+
+        Without users the idle timer is started, so a device opened ahead of a session is still
+        released when no session comes.
+        """
+
+        with self.lock:
+            if self.video is None and (self.openingThread is None or not self.openingThread.is_alive()):
+                self.openingThread = threading.Thread(target=self.openDevice, name="camera-open", daemon=True)
+                self.openingThread.start()
+            if self.users == 0:
+                self.startIdleTimer()
+
+    def startIdleTimer(self):
+        """
+        Starts the timer releasing the device after idleTimeout unless it runs already, the caller
+        holds the lock.
+        """
+
+        if self.idleTimer is None:
+            self.idleTimer = threading.Timer(self.idleTimeout, self.closeIdle)
+            self.idleTimer.daemon = True
+            self.idleTimer.start()
+
+    def openDevice(self):
+        """
+        Opens and configures the device, runs on the opening thread.
+
+        A missing or busy device is released again and video stays None, so the next acquire()
+        retries.
+        """
+
+        video = cv2.VideoCapture(self.device)
+        if not video.isOpened():
+            video.release()
+            logger.warning("Camera %s could not be opened", self.device)
+            return
+
+        video.set(3, self.frameWidth)
+        video.set(4, self.frameHeight)
+        video.set(100, 150)
+
+        with self.lock:
+            self.video = video
+
+    def isOpened(self):
+        """
+        Returns True once the device can be read.
+
+        Returns
+        -------
+        :return bool
+            Whether the device is open.
+        """
+
+        return self.video is not None
+
+    def acquire(self):
+        """
+        Registers a session and makes sure the device is opening, reopening it when the idle
+        release closed it in the meantime.
+        """
+
+        with self.lock:
+            if self.idleTimer is not None:
+                self.idleTimer.cancel()
+                self.idleTimer = None
+            self.users += 1
+
+        self.open()
+
+    def release(self):
+        """
+        Unregisters a session, the device is closed after idleTimeout without users.
+        """
+
+        with self.lock:
+            self.users = max(self.users - 1, 0)
+            if self.users == 0:
+                self.startIdleTimer()
+
+    def read(self):
+        """
+        Returns the next frame.
+
+        Returns
+        -------
+        :return np.ndarray or None
+            The BGR frame, None while the device is not open or returned no frame.
+        """
+
+        with self.lock:
+            if self.video is None:
+                return None
+            success, frame = self.video.read()
+            self.frameTime = time.perf_counter()
+
+        return frame if success else None
+
+    def closeIdle(self):
+        """
+        Releases the device unless a session acquired it again, runs on the idle timer thread.
+
+        The users check and the release happen under the lock, so a session acquiring the camera
+        meanwhile either keeps the device open or reopens it afterwards.
+        """
+
+        openingThread = self.openingThread
+        if openingThread is not None:
+            openingThread.join()
+
+        with self.lock:
+            if threading.current_thread() is not self.idleTimer:  # cancelled or replaced meanwhile
+                return
+            self.idleTimer = None
+            if self.users == 0 and self.video is not None:
+                self.video.release()
+                self.video = None
+
+    def close(self):
+        """
+        Releases the device immediately, waiting for a pending open to finish first.
+        """
+
+        with self.lock:
+            if self.idleTimer is not None:
+                self.idleTimer.cancel()
+                self.idleTimer = None
+
+        if self.openingThread is not None:
+            self.openingThread.join()
+
+        with self.lock:
+            if self.video is not None:
+                self.video.release()
+                self.video = None
@@ -5,6 +5,11 @@ class GuiUtils:
     """
     A utility class for common GUI operations.
 
+    Attributes
+    ----------
+    screenSize : tuple[int, int] or None
+        Screen size measured by the first getScreenSize call (default None)
+
     Methods
     -------
     centerOnStart(win: Tk, windowWidth: int, windowHeight: int):
@@ -35,6 +40,8 @@ class GuiUtils:
         Saves the given image to a file.
     """
 
+    screenSize: tuple[int, int] | None = None
+
     @staticmethod
     def centerOnStart(win: Tk, windowWidth: int, windowHeight: int):
         """
@@ -58,14 +65,16 @@ class GuiUtils:
     @staticmethod
     def getScreenSize():
         """
-        Returns the size of the screen.
+        Returns the size of the screen, grabbing the screen only on the first call.
 
         Returns
         -------
         :return: tuple[int, int]
             Width and height of the screen.
         """
-        return ImageGrab.grab().size
+        if GuiUtils.screenSize is None:
+            GuiUtils.screenSize = ImageGrab.grab().size
+        return GuiUtils.screenSize
 
     @staticmethod
     def getScreenScale(window: Tk):
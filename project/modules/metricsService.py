@@ -0,0 +1,247 @@
+import csv
+import logging
+import os
+import time
+from collections import deque
+from contextlib import nullcontext
+from PIL import Image, ImageDraw
+import numpy as np
+
+STAGES = ('capture', 'detect', 'warp', 'pen', 'merge', 'display')
+NULL_STAGE = nullcontext()
+
+logger = logging.getLogger(__name__)
+
+
+class StageTimer:
+    """
+    A reusable context manager timing one stage of a frame.
+
+    Attributes
+    ----------
+    samples : deque
+        Rolling window of stage durations in seconds
+    start : float
+        perf_counter value at the start of the stage
+    """
+
+    def __init__(self, windowSize: int):
+        self.samples: deque = deque(maxlen=windowSize)
+        self.start: float = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.samples.append(time.perf_counter() - self.start)
+        return False
+
+
+class MetricsService:
+    """
+    A class used to collect rolling-window performance metrics of the capture and render loops.
+
+    Attributes
+    ----------
+    enabled : bool
+        When False every hook is a shared no-op context (default False)
+    windowSize : int
+        Number of frames kept for FPS and percentiles (default 120)
+    frameBudget : float
+        Target frame interval in seconds, longer intervals count as dropped frames (default 1 / 30)
+    dumpPath : str or None
+        CSV file the summary is appended to, None only logs it (default None)
+    dumpInterval : float
+        Seconds between two summary dumps (default 5.0)
+    timers : dict[str, StageTimer]
+        Stage timers keyed by stage name
+    frameTimes : deque
+        perf_counter values at the end of the last frames
+    droppedFrames : int
+        Number of frame slots missed since the start of the collection
+    lastDump : float
+        perf_counter value of the last dump
+    idling : bool
+        Whether the loop skipped frames since the last one, the pause is not counted as dropped
+
+    Methods
+    -------
+    stage(name: str):
+        Returns a context manager timing the given stage.
+    frame():
+        Marks the end of a frame.
+    idle():
+        Marks a frame skipped on purpose.
+    reset():
+        Clears all collected samples.
+    getSummary():
+        Returns FPS, dropped frames and per-stage p50/p99.
+    getOverlayText():
+        Returns the summary formatted for the overlay.
+    drawOverlay(image: Image):
+        Returns a copy of the image with the summary drawn on it.
+    dump():
+        Writes the summary to the log and to the CSV file.
+    """
+
+    def __init__(self, enabled: bool = False, windowSize: int = 120, frameBudget: float = 1 / 30,
+                 dumpPath: str | None = None, dumpInterval: float = 5.0):
+        self.enabled: bool = enabled
+        self.windowSize: int = windowSize
+        self.frameBudget: float = frameBudget
+        self.dumpPath: str | None = dumpPath
+        self.dumpInterval: float = dumpInterval
+        self.timers: dict[str, StageTimer] = {name: StageTimer(windowSize) for name in STAGES}
+        self.frameTimes: deque = deque(maxlen=windowSize)
+        self.droppedFrames: int = 0
+        self.lastDump: float = time.perf_counter()
+        self.idling: bool = False
+
+    def stage(self, name: str):
+        """
+        Returns a context manager timing the given stage.
+
+        Parameters
+        ----------
+        :param name : str
+            Name of the stage.
+
+        Returns
+        -------
+        :return StageTimer or nullcontext
+            Timer of the stage, shared no-op context when metrics are disabled.
+        """
+
+        if not self.enabled:
+            return NULL_STAGE
+
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = StageTimer(self.windowSize)
+        return timer
+
+    def frame(self):
+        """
+        Marks the end of a frame, counts missed frame slots and dumps the summary when it is due.
+        """
+
+        if not self.enabled:
+            return
+
+        now = time.perf_counter()
+        if self.idling:
+            self.idling = False
+            self.frameTimes.clear()
+        elif self.frameTimes:
+            missed = int((now - self.frameTimes[-1]) / self.frameBudget) - 1
+            if missed > 0:
+                self.droppedFrames += missed
+        self.frameTimes.append(now)
+
+        if now - self.lastDump >= self.dumpInterval:
+            self.lastDump = now
+            self.dump()
+
+    def idle(self):
+        """
+        Marks a frame skipped on purpose, the pause before the next frame is not counted as dropped.
+        """
+
+        self.idling = self.enabled
+
+    def reset(self):
+        """
+        Clears all collected samples.
+        """
+
+        for timer in self.timers.values():
+            timer.samples.clear()
+        self.frameTimes.clear()
+        self.droppedFrames = 0
+
+    def getSummary(self):
+        """
+        Returns FPS, dropped frames and per-stage p50/p99.
+
+        Returns
+        -------
+        :return dict
+            FPS over the window, dropped frames and stage percentiles in milliseconds.
+        """
+
+        fps = 0.0
+        if len(self.frameTimes) > 1:
+            fps = (len(self.frameTimes) - 1) / (self.frameTimes[-1] - self.frameTimes[0])
+
+        stages = {}
+        for name, timer in self.timers.items():
+            if timer.samples:
+                p50, p99 = np.percentile(timer.samples, [50, 99]) * 1000
+                stages[name] = (float(p50), float(p99))
+
+        return {'fps': fps, 'dropped': self.droppedFrames, 'stages': stages}
+
+    def getOverlayText(self):
+        """
+        Returns the summary formatted for the overlay.
+
+        Returns
+        -------
+        :return str
+            One line for FPS and dropped frames followed by one line per stage.
+        """
+
+        summary = self.getSummary()
+        lines = [f"{summary['fps']:.1f} FPS  dropped {summary['dropped']}"]
+        for name, (p50, p99) in summary['stages'].items():
+            lines.append(f"{name:8} p50 {p50:6.1f} ms  p99 {p99:6.1f} ms")
+        return "\n".join(lines)
+
+    def drawOverlay(self, image: Image):
+        """
+        Returns a copy of the image with the summary drawn on it.
+
+        Parameters
+        ----------
+        :param image : Image
+            The image to draw on.
+
+        Returns
+        -------
+        :return Image
+            The image with the overlay.
+        """
+
+        overlay = image.convert('RGB')
+        draw = ImageDraw.Draw(overlay)
+        text = self.getOverlayText()
+        box = draw.multiline_textbbox((8, 8), text)
+        draw.rectangle((box[0] - 4, box[1] - 4, box[2] + 4, box[3] + 4), fill=(0, 0, 0))
+        draw.multiline_text((8, 8), text, fill=(0, 255, 0))
+        return overlay
+
+    def dump(self):
+        """
+        Writes the summary to the log and to the CSV file.
+        """
+
+        summary = self.getSummary()
+        logger.info(self.getOverlayText().replace("\n", " | "))
+
+        if self.dumpPath is None:
+            return
+
+        header = ['timestamp', 'fps', 'dropped']
+        row = [time.strftime('%Y-%m-%dT%H:%M:%S'), round(summary['fps'], 2), summary['dropped']]
+        for name in STAGES:
+            p50, p99 = summary['stages'].get(name, (0.0, 0.0))
+            header += [f"{name}_p50", f"{name}_p99"]
+            row += [round(p50, 3), round(p99, 3)]
+
+        isNew = not os.path.exists(self.dumpPath)
+        with open(self.dumpPath, 'a', newline='') as file:
+            writer = csv.writer(file)
+            if isNew:
+                writer.writerow(header)
+            writer.writerow(row)
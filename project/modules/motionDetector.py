@@ -0,0 +1,95 @@
+from project.modules.bufferPool import BufferPool
+import cv2
+import numpy as np
+
+
+class MotionDetector:
+    """
+    A class used to tell whether the camera scene changed since the previous frame.
+
+    Frames are compared as small grayscale thumbnails, so a check costs a fraction of the
+    full-resolution pipeline it gates.
+
+    Attributes
+    ----------
+    size : tuple[int, int]
+        Size of the compared thumbnails (default (160, 90))
+    pixelThreshold : int
+        Minimal gray level difference of a changed thumbnail pixel (default 12)
+    minChangedPixels : int
+        Number of changed thumbnail pixels that counts as motion (default 2)
+    settleFrames : int
+        Number of still frames reported as moving after the last motion (default 10)
+    previous : np.ndarray or None
+        Thumbnail of the previous frame (default None)
+    current : np.ndarray or None
+        Thumbnail of the current frame (default None)
+    stillFrames : int
+        Number of consecutive frames without motion
+    buffers : BufferPool
+        Thumbnail-sized arrays reused between frames (default BufferPool())
+
+    Methods
+    -------
+    update(image: np.ndarray):
+        Compares the frame with the previous one and returns True while the scene is moving.
+    reset():
+        Forgets the previous frame so the next one is reported as moving.
+    """
+
+    def __init__(self, size: tuple[int, int] = (160, 90), pixelThreshold: int = 12, minChangedPixels: int = 2,
+                 settleFrames: int = 10):
+        self.size: tuple[int, int] = size
+        self.pixelThreshold: int = pixelThreshold
+        self.minChangedPixels: int = minChangedPixels
+        self.settleFrames: int = settleFrames
+        self.previous: np.ndarray | None = None
+        self.current: np.ndarray | None = None
+        self.stillFrames: int = 0
+        self.buffers: BufferPool = BufferPool()
+
+    def update(self, image: np.ndarray):
+        """
+        Compares the frame with the previous one and returns True while the scene is moving.
+
+        Parameters
+        ----------
+        :param image : np.ndarray
+            The BGR camera frame.
+
+        Returns
+        -------
+        :return bool
+            False once the scene has been still for settleFrames frames.
+        """
+
+        shape = (self.size[1], self.size[0])
+        thumbnail = cv2.resize(image, self.size, dst=self.buffers.get('thumbnail', shape + image.shape[2:]),
+                               interpolation=cv2.INTER_AREA)
+        self.current = cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY, dst=self.current)
+
+        if self.previous is None:
+            self.previous = self.current.copy()
+            self.stillFrames = 0
+            return True
+
+        difference = cv2.absdiff(self.current, self.previous, dst=self.buffers.get('difference', shape))
+        changedPixels = cv2.threshold(difference, self.pixelThreshold, 255, cv2.THRESH_BINARY,
+                                      dst=self.buffers.get('changed', shape))[1]
+        changed = cv2.countNonZero(changedPixels)
+        self.previous, self.current = self.current, self.previous
+
+        if changed >= self.minChangedPixels:
+            self.stillFrames = 0
+        else:
+            self.stillFrames += 1
+
+        return self.stillFrames <= self.settleFrames
+
+    def reset(self):
+        """
+        Forgets the previous frame so the next one is reported as moving.
+        """
+
+        self.previous = None
+        self.stillFrames = 0
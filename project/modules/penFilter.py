@@ -0,0 +1,152 @@
+import math
+
+
+class PenFilter:
+    """
+    A class used to smooth pen positions and predict them forward in time.
+
+    Positions are filtered with a one euro filter: a low-pass filter whose cutoff frequency rises
+    with the pen speed, so slow strokes are smoothed strongly while fast strokes keep up. The
+    filtered velocity extrapolates the position by the pipeline latency.
+
+    Attributes
+    ----------
+    minCutoff : float
+        Cutoff frequency in Hz at rest, lower values smooth more (default 1.0)
+    beta : float
+        Increase of the cutoff per pixel per second of speed, higher values lag less (default 0.01)
+    derivativeCutoff : float
+        Cutoff frequency in Hz of the velocity filter (default 1.0)
+    maxPrediction : float
+        Longest extrapolation in seconds (default 0.1)
+    resetTimeout : float
+        Seconds without measurements after which the filter starts over (default 0.5)
+    position : tuple[float, float] or None
+        Filtered position (default None)
+    measurement : tuple[float, float] or None
+        Last raw measurement the velocity is differentiated against (default None)
+    velocity : tuple[float, float]
+        Filtered velocity in pixels per second (default (0.0, 0.0))
+    lastTime : float
+        Timestamp of the last measurement in seconds (default 0.0)
+
+    Methods
+    -------
+    smoothingFactor(cutoff: float, elapsed: float):
+        Returns the exponential smoothing factor of a cutoff frequency.
+    update(x: float, y: float, timestamp: float):
+        Filters a measured position and returns the smoothed one.
+    predict(latency: float):
+        Returns the filtered position extrapolated by the given latency.
+    reset():
+        Forgets the filter state.
+    """
+
+    def __init__(self, minCutoff: float = 1.0, beta: float = 0.01, derivativeCutoff: float = 1.0,
+                 maxPrediction: float = 0.1, resetTimeout: float = 0.5):
+        self.minCutoff: float = minCutoff
+        self.beta: float = beta
+        self.derivativeCutoff: float = derivativeCutoff
+        self.maxPrediction: float = maxPrediction
+        self.resetTimeout: float = resetTimeout
+        self.position: tuple[float, float] | None = None
+        self.measurement: tuple[float, float] | None = None
+        self.velocity: tuple[float, float] = (0.0, 0.0)
+        self.lastTime: float = 0.0
+
+    @staticmethod
+    def smoothingFactor(cutoff: float, elapsed: float):
+        """
+        Returns the exponential smoothing factor of a cutoff frequency.
+
+        Parameters
+        ----------
+        :param cutoff : float
+            Cutoff frequency in Hz.
+        :param elapsed : float
+            Seconds since the previous measurement.
+
+        Returns
+        -------
+        :return float
+            Weight of the new measurement between 0 and 1.
+        """
+
+        timeConstant = 1 / (2 * math.pi * cutoff)
+        return 1 / (1 + timeConstant / elapsed)
+
+    def update(self, x: float, y: float, timestamp: float):
+        """
+        Filters a measured position and returns the smoothed one.
+
+        Parameters
+        ----------
+        :param x : float
+            Measured x-coordinate.
+        :param y : float
+            Measured y-coordinate.
+        :param timestamp : float
+            Time of the measurement in seconds.
+
+        Returns
+        -------
+        :return tuple[float, float]
+            The filtered position.
+        """
+
+        elapsed = timestamp - self.lastTime
+        if self.position is None or elapsed > self.resetTimeout:
+            self.position = (x, y)
+            self.measurement = (x, y)
+            self.velocity = (0.0, 0.0)
+            self.lastTime = timestamp
+            return self.position
+        if elapsed <= 0:
+            return self.position
+
+        lastX, lastY = self.position
+        measuredX, measuredY = self.measurement
+        velocityFactor = self.smoothingFactor(self.derivativeCutoff, elapsed)
+        velocityX = self.velocity[0] + velocityFactor * ((x - measuredX) / elapsed - self.velocity[0])
+        velocityY = self.velocity[1] + velocityFactor * ((y - measuredY) / elapsed - self.velocity[1])
+
+        cutoff = self.minCutoff + self.beta * math.hypot(velocityX, velocityY)
+        positionFactor = self.smoothingFactor(cutoff, elapsed)
+
+        self.position = (lastX + positionFactor * (x - lastX), lastY + positionFactor * (y - lastY))
+        self.measurement = (x, y)
+        self.velocity = (velocityX, velocityY)
+        self.lastTime = timestamp
+        return self.position
+
+    def predict(self, latency: float):
+        """
+        Returns the filtered position extrapolated by the given latency.
+
+        Parameters
+        ----------
+        :param latency : float
+            Seconds to extrapolate, limited to maxPrediction.
+
+        Returns
+        -------
+        :return tuple[float, float] or None
+            The predicted position, None before the first measurement.
+        """
+
+        if self.position is None:
+            return None
+
+        horizon = min(max(latency, 0.0), self.maxPrediction)
+        return (self.position[0] + self.velocity[0] * horizon,
+                self.position[1] + self.velocity[1] * horizon)
+
+    def reset(self):
+        """
+        Forgets the filter state.
+        """
+
+        self.position = None
+        self.measurement = None
+        self.velocity = (0.0, 0.0)
+        self.lastTime = 0.0
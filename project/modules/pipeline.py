@@ -0,0 +1,314 @@
+from project.modules.metricsService import MetricsService, NULL_STAGE
+
+
+class Stage:
+    """
+    A node of a Pipeline computing one result from the results of its inputs.
+
+    The result is memoized on the versions of the inputs: as long as none of them produced a new
+    result, the function is not called again. A stage returning None keeps its previous result,
+    which lets gates like the motion check stop everything downstream without invalidating it.
+
+    Attributes
+    ----------
+    name : str
+        Name the stage is referred to by
+    function : callable or None
+        Computes the result from the input results, None for inputs set from outside
+    inputs : tuple[str, ...]
+        Names of the stages whose results are passed to function, in order
+    cache : bool
+        Whether the result is reused while the input versions are unchanged, sources reading a
+        device every run disable it (default True)
+    key : callable or None
+        Maps a result to a value compared with the previous one, an equal value keeps the version so
+        dependents stay cached (default None, every result is new)
+    timer : str or None
+        Metrics stage the function is timed as (default None)
+    output : object
+        Latest result (default None)
+    version : int
+        Number of new results produced, 0 before the first one (default 0)
+    outputKey : object
+        key of the latest result (default None)
+    inputVersions : tuple or None
+        Input versions of the latest function call (default None)
+    changed : bool
+        Whether the latest run produced a new version (default False)
+    runs : int
+        Number of function calls (default 0)
+    hits : int
+        Number of runs answered from the cache (default 0)
+
+    Methods
+    -------
+    run(inputs: list[Stage], metrics: MetricsService):
+        Updates the result from the given input stages.
+    reset():
+        Forgets the result.
+    """
+
+    def __init__(self, name: str, function=None, inputs: tuple[str, ...] = (), cache: bool = True, key=None,
+                 timer: str | None = None):
+        self.name: str = name
+        self.function = function
+        self.inputs: tuple[str, ...] = tuple(inputs)
+        self.cache: bool = cache
+        self.key = key
+        self.timer: str | None = timer
+        self.output = None
+        self.version: int = 0
+        self.outputKey = None
+        self.inputVersions: tuple | None = None
+        self.changed: bool = False
+        self.runs: int = 0
+        self.hits: int = 0
+
+    def run(self, inputs: list, metrics: MetricsService):
+        """
+        Updates the result from the given input stages.
+
+        Nothing is computed while an input has no result yet or, for cached stages, while the input
+        versions equal those of the latest result.
+
+        Parameters
+        ----------
+        :param inputs : list[Stage]
+            Stages named in self.inputs, in the same order.
+        :param metrics : MetricsService
+            Registry the function is timed with.
+        """
+
+        self.changed = False
+        inputVersions = tuple(stage.version for stage in inputs)
+        if 0 in inputVersions:
+            return
+        if self.cache and inputVersions == self.inputVersions:
+            self.hits += 1
+            return
+
+        with metrics.stage(self.timer) if self.timer is not None else NULL_STAGE:
+            output = self.function(*(stage.output for stage in inputs))
+        self.runs += 1
+        self.inputVersions = inputVersions
+        if output is None:
+            return
+
+        outputKey = self.key(output) if self.key is not None else None
+        if self.key is not None and self.version and outputKey == self.outputKey:
+            self.output = output
+            return
+
+        self.output = output
+        self.outputKey = outputKey
+        self.version += 1
+        self.changed = True
+
+    def reset(self):
+        """
+        Forgets the result, dependents wait for the next one.
+        """
+
+        self.output = None
+        self.version = 0
+        self.outputKey = None
+        self.inputVersions = None
+        self.changed = False
+
+
+class Pipeline:
+    """
+    A class used to run image processing as a graph of memoized stages.
+
+    Stages are added in dependency order, every input has to be added before the stages using it.
+    A run only executes the stages the requested targets depend on, and a stage only recomputes when
+    one of its inputs produced a new version since its last result. The same graph can be driven by
+    the GUI or headless, e.g. from the benchmark.
+
+    Attributes
+    ----------
+    stages : dict[str, Stage]
+        Stages keyed by name, in the order they were added
+    metrics : MetricsService
+        Registry the stage timers report to (default disabled MetricsService)
+    plans : dict[tuple[str, ...], list[tuple[Stage, list[Stage]]]]
+        Stages with their input stages to run for each requested set of targets
+
+    Methods
+    -------
+    add(name: str, function, inputs: tuple[str, ...], cache: bool, key, timer: str | None):
+        Adds a stage computed from the given inputs.
+    addInput(name: str):
+        Adds a stage whose result is set from outside.
+    set(name: str, value):
+        Sets the result of an input stage.
+    getPlan(targets: tuple[str, ...]):
+        Returns the stages the targets depend on in execution order.
+    run(*targets: str):
+        Brings the results of the targets up to date.
+    getOutput(name: str):
+        Returns the latest result of a stage.
+    reset():
+        Forgets all results.
+    getStatistics():
+        Returns the function calls and cache hits of every stage.
+    """
+
+    def __init__(self, metrics: MetricsService | None = None):
+        self.stages: dict[str, Stage] = {}
+        self.metrics: MetricsService = metrics or MetricsService()
+        self.plans: dict[tuple[str, ...], list[tuple[Stage, list[Stage]]]] = {}
+
+    def add(self, name: str, function, inputs: tuple[str, ...] = (), cache: bool = True, key=None,
+            timer: str | None = None):
+        """
+        Adds a stage computed from the given inputs.
+
+        Parameters
+        ----------
+        :param name : str
+            Unique name of the stage.
+        :param function : callable
+            Computes the result from the input results, None keeps the previous result.
+        :param inputs : tuple[str, ...]
+            Names of stages added before (default no inputs, the stage is a source)
+        :param cache : bool
+            Whether the result is reused while the inputs are unchanged (default True)
+        :param key : callable or None
+            Maps a result to a value, an unchanged value keeps the version (default None)
+        :param timer : str or None
+            Metrics stage the function is timed as (default None)
+
+        Returns
+        -------
+        :return Stage
+            The added stage.
+        """
+
+        if name in self.stages:
+            raise ValueError(f"Stage {name} already exists")
+        missing = [inputName for inputName in inputs if inputName not in self.stages]
+        if missing:
+            raise ValueError(f"Stage {name} uses unknown inputs {missing}")
+
+        stage = self.stages[name] = Stage(name, function, inputs, cache, key, timer)
+        self.plans.clear()
+        return stage
+
+    def addInput(self, name: str):
+        """
+        Adds a stage whose result is set from outside with set().
+
+        Parameters
+        ----------
+        :param name : str
+            Unique name of the stage.
+
+        Returns
+        -------
+        :return Stage
+            The added stage.
+        """
+
+        return self.add(name, None)
+
+    def set(self, name: str, value):
+        """
+        Sets the result of an input stage, passing the current result again keeps its version.
+
+        Parameters
+        ----------
+        :param name : str
+            Name of the input stage.
+        :param value : object
+            The new result.
+        """
+
+        stage = self.stages[name]
+        stage.changed = value is not stage.output
+        if stage.changed:
+            stage.output = value
+            stage.version += 1
+
+    def getPlan(self, targets: tuple[str, ...]):
+        """
+        Returns the stages the targets depend on in execution order.
+
+        Parameters
+        ----------
+        :param targets : tuple[str, ...]
+            Names of the requested stages.
+
+        Returns
+        -------
+        :return list[tuple[Stage, list[Stage]]]
+            Stages with their input stages, input stages set from outside are left out.
+        """
+
+        plan = self.plans.get(targets)
+        if plan is not None:
+            return plan
+
+        needed = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in needed:
+                needed.add(name)
+                pending.extend(self.stages[name].inputs)
+
+        plan = self.plans[targets] = [(stage, [self.stages[inputName] for inputName in stage.inputs])
+                                      for name, stage in self.stages.items()
+                                      if name in needed and stage.function is not None]
+        return plan
+
+    def run(self, *targets: str):
+        """
+        Brings the results of the targets up to date.
+
+        Parameters
+        ----------
+        :param targets : str
+            Names of the requested stages.
+        """
+
+        for stage, inputs in self.getPlan(targets):
+            stage.run(inputs, self.metrics)
+
+    def getOutput(self, name: str):
+        """
+        Returns the latest result of a stage.
+
+        Parameters
+        ----------
+        :param name : str
+            Name of the stage.
+
+        Returns
+        -------
+        :return object
+            The result, None before the first one.
+        """
+
+        return self.stages[name].output
+
+    def reset(self):
+        """
+        Forgets all results.
+        """
+
+        for stage in self.stages.values():
+            stage.reset()
+
+    def getStatistics(self):
+        """
+        Returns the function calls and cache hits of every stage.
+
+        Returns
+        -------
+        :return dict[str, dict[str, int]]
+            Runs, hits and versions keyed by stage name.
+        """
+
+        return {name: {'runs': stage.runs, 'hits': stage.hits, 'versions': stage.version}
+                for name, stage in self.stages.items() if stage.function is not None}
@@ -1,20 +1,47 @@
 from PIL import Image
+from project.modules.metricsService import MetricsService
+from project.modules.bufferPool import BufferPool
+from project.modules.motionDetector import MotionDetector
+from project.modules.cameraService import CameraService
+from project.modules.penFilter import PenFilter
+from project.modules.sessionRecorder import SessionRecorder
+from project.modules.pipeline import Pipeline
+import time
 import cv2
 import numpy as np
 
+REFERENCE_AREA = 1920 * 1080  # processing area the pixel area thresholds were tuned for
+INK_LABEL = 1  # canvas value of pen strokes, 0 is no ink
+
 
 class ScannerService:
     """
     A class used to perform various scanning operations.
 
+    Intermediate images are written into buffers reused between frames, arrays returned by the
+    processing methods are only valid until the next frame.
+
+    Camera frames are resized to the processing size before detection, and pen positions are
+    mapped from the processed image onto a canvas of its own size, so the capture, processing
+    and canvas resolutions can be chosen independently.
+
+    Frames run through a Pipeline of memoized stages: capture -> frame -> motion -> corners ->
+    page -> homography -> rectified -> pen -> compose, with the screenshot as an input of compose
+    and record as a sink of capture. A still scene stops at motion, and a page that did not move
+    keeps the homography of the previous frame.
+
     Attributes
     ----------
-    video : cv2.VideoCapture or None
-        Video capture object for webcam (default None)
+    camera : CameraService
+        Webcam shared between scanner sessions (default CameraService())
     frameWidth : int
-        Width of the video frame (default 1920)
+        Width of the processed frame (default 1920)
     frameHeight : int
-        Height of the video frame (default 1080)
+        Height of the processed frame (default 1080)
+    canvasWidth : int
+        Width of the ink canvas (default frameWidth)
+    canvasHeight : int
+        Height of the ink canvas (default frameHeight)
     edgeSize : int
         Size of the edge to crop (default 0)
     oldCoordinates : list
@@ -24,59 +51,236 @@ class ScannerService:
     kernel : np.ndarray
         Kernel for morphological operations (default np.ones((5, 5)))
     noiseArea : int
-        Minimum area to be considered as valid pen detection (default 200)
+        Minimum area to be considered as valid pen detection (default 200 at 1920x1080, scaled with the frame area)
+    minPageArea : int
+        Minimum area of a page contour (default 100000 at 1920x1080, scaled with the frame area)
+    penThickness : int
+        Thickness of the drawn lines in canvas pixels (default 6)
     canvas : np.ndarray
-        Canvas to draw the detected pen movements (default None)
+        Single-channel label plane the detected pen movements are drawn into, 0 where there is no
+        ink and the palette index of the stroke color elsewhere (default None)
     penCords : tuple
         Coordinates of the pen (default (0, 0))
+    penPrediction : tuple[int, int] or None
+        Canvas position the pen is predicted at once the frame is displayed, drawn as a transient
+        tail by mergeImages and never written into the canvas (default None)
+    strokeCount : int
+        Number of lines drawn on the canvas (default 0)
     penColor : tuple
-        Color of the pen (default [255, 0, 0])
+        RGB color of the pen (default (255, 0, 0))
+    palette : np.ndarray
+        RGB color of every canvas label, penColor at INK_LABEL (default 256 x 3 uint8)
+    inkLabels : tuple[int, ...]
+        Canvas labels painted by mergeImages (default (INK_LABEL,))
+    metrics : MetricsService
+        Registry the stage timings are reported to (default disabled MetricsService)
+    buffers : BufferPool
+        Per-resolution arrays the OpenCV calls write into (default BufferPool())
+    mergeSource : Image or None
+        Bottom layer of the last mergeImages call (default None)
+    mergeBottom : np.ndarray or None
+        RGB array of mergeSource (default None)
+    motionDetector : MotionDetector
+        Change detector gating the pipeline (default MotionDetector())
+    sceneChanged : bool
+        Whether the last getFinalImage or getComposedImage call produced a new image (default True)
+    sceneMoving : bool
+        Whether the motion detector saw the scene move in the last getFinalImage or getComposedImage
+        call, including its settle frames (default True)
+    penFilter : PenFilter
+        Smoothing and prediction filter of the pen position (default PenFilter())
+    captureTime : float
+        perf_counter value when the last processed frame was captured (default 0.0)
+    latency : float
+        Smoothed capture-to-display latency in seconds the pen tail is predicted ahead by (default 0.0)
+    recorder : SessionRecorder or None
+        Recorder every captured frame is passed to (default None)
+    colorsMotionDetector : MotionDetector
+        Change detector of the color configuration preview (default MotionDetector())
+    colorsFrame : np.ndarray or None
+        Last frame of the color configuration preview at preview size (default None)
+    colorsRange : tuple[np.ndarray, np.ndarray] or None
+        HSV range the last preview was filtered with (default None)
+    pipeline : Pipeline
+        Stage graph from the camera frame to the composed image (default createPipeline())
 
     Methods
     -------
+    createPipeline():
+        Builds the stage graph of the scanner.
+    readFrame():
+        Reads the next camera frame.
+    resizeToFrame(image: np.ndarray):
+        Resizes a camera frame to the processing size.
+    gateMotion(image: np.ndarray):
+        Passes the frame on only when the scene moved.
     preProcessing(image: Image):
         Preprocesses the image to find edges.
     getCornerPoints(image: Image):
         Finds the corner points of the largest contour.
-    getWarp(image: Image, pageCoordinates: np.ndarray):
-        Warps the image based on the given coordinates.
-    setPerspective(image: Image, cords: np.ndarray):
-        Sets the perspective transform for the image.
+    selectPage(pageCoordinates: np.ndarray):
+        Returns the page corners to warp with, the previous ones while the page is covered.
+    getHomography(page: np.ndarray):
+        Returns the perspective transform from the page corners to the frame.
+    rectify(image: np.ndarray, matrix: np.ndarray):
+        Warps and post-processes the image with a perspective transform.
     postProcess(image: Image):
         Post-processes the image by rotating and cropping edges.
-    processImage(image: Image):
-        Processes the image to find and warp the largest contour.
-    getPenFromImage(image: Image):
+    mapToCanvas(x: float, y: float, width: int, height: int):
+        Maps a point of the processed image to canvas coordinates.
+    getPenFromImage(image: Image, timestamp: float | None = None):
         Detects the pen in the image and draws its movement on the canvas.
+    reportDisplayed():
+        Updates the latency after the last frame was displayed.
+    recordFrame(frame: np.ndarray):
+        Passes a captured frame with its tracking results to the recorder.
     startScanner():
-        Starts the video capture for scanning.
+        Starts a scanning session on the camera.
     stopScanner():
-        Stops the video capture.
+        Stops the scanning session, the camera stays warm for the next one.
     getFinalImage():
         Gets the final processed image with pen movements.
-    getColorsImage(lower: np.ndarray, higher: np.ndarray):
+    getComposedImage(screenshot: Image):
+        Gets the screenshot with the pen movements painted on it.
+    getColorsImage(lower: np.ndarray, higher: np.ndarray, displaySize: tuple[int, int] | None = None):
         Gets the image filtered by the specified HSV color range.
-    mergeImages(bottomLayer: Image, topLayer: Image):
-        Merges two images with alpha blending.
+    estimateColorRange(region: tuple[int, int, int, int], lowPercentile: float = 2, highPercentile: float = 98):
+        Estimates the HSV range of the pen from a region of the last preview frame.
+    mergeImages(bottomLayer: Image, topLayer: np.ndarray):
+        Paints the ink of a canvas over an image.
     """
 
-    def __init__(self, colorValues: [np.array, np.array]):
+    def __init__(self, colorValues: [np.array, np.array], metrics: MetricsService | None = None,
+                 camera: CameraService | None = None, frameSize: tuple[int, int] = (1920, 1080),
+                 canvasSize: tuple[int, int] | None = None):
         """
         :param colorValues:
             Color values of detected pen(default read from file)
+        :param metrics:
+            Registry for stage timings(default disabled MetricsService)
+        :param camera:
+            Webcam shared between sessions(default CameraService())
+        :param frameSize:
+            Width and height the camera frames are processed at(default (1920, 1080))
+        :param canvasSize:
+            Width and height of the ink canvas(default frameSize)
         """
 
-        self.video: cv2.VideoCapture | None = None
-        self.frameWidth: int = 1920
-        self.frameHeight: int = 1080
+        self.camera: CameraService = camera or CameraService()
+        self.frameWidth: int = frameSize[0]
+        self.frameHeight: int = frameSize[1]
+        self.canvasWidth: int = (canvasSize or frameSize)[0]
+        self.canvasHeight: int = (canvasSize or frameSize)[1]
         self.edgeSize: int = 0
         self.oldCoordinates: list = []
         self.colorValues: [np.array, np.array] = colorValues
         self.kernel: np.ndarray = np.ones((5, 5))
-        self.noiseArea: int = 200
+        areaScale = self.frameWidth * self.frameHeight / REFERENCE_AREA
+        self.noiseArea: int = int(200 * areaScale)
+        self.minPageArea: int = int(100000 * areaScale)
+        self.penThickness: int = 6
         self.canvas: np.array = None
         self.penCords: tuple[int, int] = (0, 0)
+        self.penPrediction: tuple[int, int] | None = None
+        self.strokeCount: int = 0
         self.penColor: tuple[int, int, int] = (255, 0, 0)
+        self.palette: np.ndarray = np.zeros((256, 3), dtype=np.uint8)
+        self.palette[INK_LABEL] = self.penColor
+        self.inkLabels: tuple[int, ...] = (INK_LABEL,)
+        self.metrics: MetricsService = metrics or MetricsService()
+        self.buffers: BufferPool = BufferPool()
+        self.mergeSource: Image | None = None
+        self.mergeBottom: np.ndarray | None = None
+        self.motionDetector: MotionDetector = MotionDetector()
+        self.sceneChanged: bool = True
+        self.sceneMoving: bool = True
+        self.penFilter: PenFilter = PenFilter()
+        self.captureTime: float = 0.0
+        self.latency: float = 0.0
+        self.recorder: SessionRecorder | None = None
+        self.colorsMotionDetector: MotionDetector = MotionDetector()
+        self.colorsFrame: np.ndarray | None = None
+        self.colorsRange: tuple[np.ndarray, np.ndarray] | None = None
+        self.pipeline: Pipeline = self.createPipeline()
+
+    def createPipeline(self):
+        """
+        Builds the stage graph of the scanner.
+
+        Returns
+        -------
+        :return Pipeline
+            The graph, run up to pen by getFinalImage and up to compose by getComposedImage.
+        """
+
+        pipeline = Pipeline(self.metrics)
+        pipeline.add('capture', self.readFrame, cache=False, timer='capture')
+        pipeline.add('frame', self.resizeToFrame, ('capture',))
+        pipeline.add('motion', self.gateMotion, ('frame',))
+        pipeline.add('corners', lambda image: self.getCornerPoints(self.preProcessing(image)), ('motion',),
+                     timer='detect')
+        pipeline.add('page', self.selectPage, ('corners',), key=lambda page: page.tobytes())
+        pipeline.add('homography', self.getHomography, ('page',))
+        pipeline.add('rectified', self.rectify, ('motion', 'homography'), timer='warp')
+        pipeline.add('pen', lambda image: self.getPenFromImage(image, self.captureTime), ('rectified',),
+                     key=lambda canvas: (id(canvas), self.strokeCount, self.penPrediction), timer='pen')
+        pipeline.addInput('screenshot')
+        pipeline.add('compose', self.mergeImages, ('screenshot', 'pen'), timer='merge')
+        pipeline.add('record', self.recordFrame, ('capture',))
+        return pipeline
+
+    def readFrame(self):
+        """
+        Reads the next camera frame.
+
+        Returns
+        -------
+        :return np.ndarray or None
+            The BGR frame as captured, None while the camera has no new frame.
+        """
+
+        frame = self.camera.read()
+        if frame is not None:
+            self.captureTime = self.camera.frameTime
+        return frame
+
+    def resizeToFrame(self, image: np.ndarray):
+        """
+        Resizes a camera frame to the processing size.
+
+        Parameters
+        ----------
+        :param image : np.ndarray
+            The camera frame.
+
+        Returns
+        -------
+        :return np.ndarray
+            The frame at frameWidth x frameHeight, the input itself when it already has that size.
+        """
+
+        if image.shape[1] == self.frameWidth and image.shape[0] == self.frameHeight:
+            return image
+
+        resized = self.buffers.get('frame', (self.frameHeight, self.frameWidth) + image.shape[2:])
+        return cv2.resize(image, (self.frameWidth, self.frameHeight), dst=resized, interpolation=cv2.INTER_AREA)
+
+    def gateMotion(self, image: np.ndarray):
+        """
+        Passes the frame on only when the scene moved, so a still scene keeps all later results.
+
+        Parameters
+        ----------
+        :param image : np.ndarray
+            The frame at processing size.
+
+        Returns
+        -------
+        :return np.ndarray or None
+            The frame, None while the scene is still.
+        """
+
+        return image if self.motionDetector.update(image) else None
 
     def preProcessing(self, image: Image):
         """
@@ -93,17 +297,19 @@ class ScannerService:
             The preprocessed image with edges detected.
         """
 
-        imgGray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)  # Gray image
-        imgBlur = cv2.GaussianBlur(imgGray, (1, 1), 1)  # Blur Image - easing edges
-        imgCanny = cv2.Canny(imgBlur, 100, 300)  # Canny Image - canny algo to find edges
+        shape = image.shape[:2]
+        imgGray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=self.buffers.get('gray', shape))  # Gray image
+        # Blur Image - easing edges
+        imgBlur = cv2.GaussianBlur(imgGray, (1, 1), 1, dst=self.buffers.get('blur', shape))
+        # Canny Image - canny algo to find edges
+        imgCanny = cv2.Canny(imgBlur, 100, 300, edges=self.buffers.get('canny', shape))
 
         # extending the found edges and then eroding it to smoothen the image
-        imgDilate = cv2.dilate(imgCanny, self.kernel, iterations=2)
-        imgErode = cv2.erode(imgDilate, self.kernel, iterations=1)
+        imgDilate = cv2.dilate(imgCanny, self.kernel, dst=self.buffers.get('dilate', shape), iterations=2)
+        imgErode = cv2.erode(imgDilate, self.kernel, dst=self.buffers.get('erode', shape), iterations=1)
         return imgErode
 
-    @staticmethod
-    def getCornerPoints(image: Image):
+    def getCornerPoints(self, image: Image):
         """
         Finds the corner points of the largest contour.
 
@@ -124,7 +330,7 @@ class ScannerService:
 
         for cnt in contours:
             area = cv2.contourArea(cnt)
-            if area > 100000:  # area in px x px
+            if area > self.minPageArea:  # area in px x px
                 peri = cv2.arcLength(cnt, True)  # perimeter of the closed shape
                 cornerPoints = cv2.approxPolyDP(cnt, 0.01 * peri, True)
                 if area > maxArea and len(cornerPoints) == 4:
@@ -133,59 +339,68 @@ class ScannerService:
 
         return cornerPointsOfMaxArea
 
-    def getWarp(self, image: Image, pageCoordinates: np.ndarray):
+    def selectPage(self, pageCoordinates: np.ndarray):
         """
-        Warps the image based on the given coordinates.
+        Returns the page corners to warp with, the previous ones while the page is covered.
 
         Parameters
         ----------
-        :param image : Image
-            The input image.
         :param pageCoordinates : np.ndarray
-            The coordinates for warping the image.
+            Corners found in the current frame, empty when none were found.
 
         Returns
         -------
-        :return Image
-            The warped image.
+        :return np.ndarray
+            The 4 x 2 corners, empty while no page was found yet.
         """
 
-        if not pageCoordinates.any():  # when object's perimeter is partly covered
-            prev_coord_points = self.oldCoordinates[:]
+        if pageCoordinates.any():
+            self.oldCoordinates = np.reshape(pageCoordinates, (4, 2))
 
-            if len(prev_coord_points) < 1:
-                return image
+        return np.float32(self.oldCoordinates)
 
-            image = self.setPerspective(image, prev_coord_points)
-        else:
-            new_coord_points = np.reshape(pageCoordinates, (4, 2))
-            self.oldCoordinates = new_coord_points[:]
+    def getHomography(self, page: np.ndarray):
+        """
+        Returns the perspective transform from the page corners to the frame.
 
-            image = self.setPerspective(image, new_coord_points)
+        Parameters
+        ----------
+        :param page : np.ndarray
+            The 4 x 2 page corners, empty for no page.
 
-        return image
+        Returns
+        -------
+        :return np.ndarray
+            The 3 x 3 transform, identity without a page.
+        """
+
+        if len(page) < 1:
+            return np.eye(3)
+
+        pts1 = np.float32([page[1], page[0], page[2], page[3]])
+        pts2 = np.float32([[0, 0], [self.frameWidth, 0], [0, self.frameHeight], [self.frameWidth, self.frameHeight]])
+        return cv2.getPerspectiveTransform(pts1, pts2)
 
-    def setPerspective(self, image: Image, cords: np.ndarray):
+    def rectify(self, image: np.ndarray, matrix: np.ndarray):
         """
-        Sets the perspective transform for the image.
+        Warps and post-processes the image with a perspective transform.
 
         Parameters
         ----------
-        :param image : Image
-            The input image.
-        :param cords : np.ndarray
-            The coordinates for perspective transform.
+        :param image : np.ndarray
+            The frame at processing size.
+        :param matrix : np.ndarray
+            The transform from getHomography.
 
         Returns
         -------
-        :return Image
-            The perspective transformed image.
+        :return np.ndarray
+            The rectified page.
         """
 
-        pts1 = np.float32([cords[1], cords[0], cords[2], cords[3]])
-        pts2 = np.float32([[0, 0], [self.frameWidth, 0], [0, self.frameHeight], [self.frameWidth, self.frameHeight]])
-        matrix = cv2.getPerspectiveTransform(pts1, pts2)
-        return cv2.warpPerspective(image, matrix, (self.frameWidth, self.frameHeight))
+        warp = self.buffers.get('warp', (self.frameHeight, self.frameWidth) + image.shape[2:])
+        warp = cv2.warpPerspective(image, matrix, (self.frameWidth, self.frameHeight), dst=warp)
+        return self.postProcess(warp)
 
     def postProcess(self, image: Image):
         """
@@ -202,138 +417,307 @@ class ScannerService:
             The post-processed image.
         """
 
-        rotatedImage = cv2.rotate(image, cv2.ROTATE_180)
+        rotatedImage = cv2.rotate(image, cv2.ROTATE_180, dst=self.buffers.get('rotate', image.shape))
         return rotatedImage[self.edgeSize:rotatedImage.shape[0] - self.edgeSize,
                             self.edgeSize:rotatedImage.shape[1] - self.edgeSize]
 
-    def processImage(self, image: Image):
+    def mapToCanvas(self, x: float, y: float, width: int, height: int):
         """
-        Processes the image to find and warp the largest contour.
+        Maps a point of the processed image to canvas coordinates.
+
+        The processed image is upside down, so the point is mirrored on both axes.
 
         Parameters
         ----------
-        :param image : Image
-            The input image.
+        :param x : float
+            x-coordinate in the processed image.
+        :param y : float
+            y-coordinate in the processed image.
+        :param width : int
+            Width of the processed image.
+        :param height : int
+            Height of the processed image.
 
         Returns
         -------
-        :return np.ndarray
-            The processed image.
+        :return tuple[float, float]
+            The point on the canvas.
         """
 
-        imgPreprocessed = self.preProcessing(image)
-        contours = self.getCornerPoints(imgPreprocessed)
-        imgWarp = self.getWarp(image, contours)
-        return self.postProcess(imgWarp)
+        return (width - x) * self.canvasWidth / width, (height - y) * self.canvasHeight / height
 
-    def getPenFromImage(self, image: Image):
+    def getPenFromImage(self, image: Image, timestamp: float | None = None):
         """
         Detects the pen in the image and draws its movement on the canvas.
 
+        The centroid of the pen blob is smoothed by penFilter and the ink is drawn up to the filtered
+        position. Where the pen is predicted to be once the frame is displayed is only kept in
+        penPrediction, so a wrong extrapolation never becomes permanent ink.
+
         Parameters
         ----------
         :param image : Image
             The input image.
+        :param timestamp : float or None
+            perf_counter value when the image was captured(default now)
 
         Returns
         -------
         :return np.ndarray
-            The canvas with pen movements drawn.
+            The label canvas with pen movements drawn.
         """
 
-        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        shape = image.shape[:2]
+        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV, dst=self.buffers.get('hsv', image.shape))
 
-        mask = cv2.inRange(hsv, self.colorValues[0], self.colorValues[1])
-        mask = cv2.erode(mask, self.kernel, iterations=1)
-        mask = cv2.dilate(mask, self.kernel, iterations=2)
+        mask = cv2.inRange(hsv, self.colorValues[0], self.colorValues[1], dst=self.buffers.get('mask', shape))
+        mask = cv2.erode(mask, self.kernel, dst=self.buffers.get('maskErode', shape), iterations=1)
+        mask = cv2.dilate(mask, self.kernel, dst=self.buffers.get('mask', shape), iterations=2)
 
         contours, hierarchy = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
-        if contours and cv2.contourArea(max(contours, key=cv2.contourArea)) > self.noiseArea:
-            c = max(contours, key=cv2.contourArea)
-            x2, y2, w, h = cv2.boundingRect(c)
-            x2 = 1920 - x2
-            y2 = 1080 - y2
+        if self.canvas is None or self.canvas.shape[:2] != (self.canvasHeight, self.canvasWidth):
+            self.canvas = np.zeros((self.canvasHeight, self.canvasWidth), dtype=np.uint8)
+
+        c = max(contours, key=cv2.contourArea) if contours else None
+        if c is not None and cv2.contourArea(c) > self.noiseArea:
+            moments = cv2.moments(c)
+            x, y = self.mapToCanvas(moments['m10'] / moments['m00'], moments['m01'] / moments['m00'],
+                                    image.shape[1], image.shape[0])
+            x2, y2 = self.penFilter.update(x, y, time.perf_counter() if timestamp is None else timestamp)
+            x2, y2 = round(x2), round(y2)
 
-            if self.penCords[0] != 0 or self.penCords[1] != 0:
-                self.canvas = cv2.line(self.canvas, self.penCords, (x2, y2), self.penColor, 6)
+            if (self.penCords[0] != 0 or self.penCords[1] != 0) and (x2, y2) != self.penCords:
+                self.canvas = cv2.line(self.canvas, self.penCords, (x2, y2), INK_LABEL, self.penThickness)
+                self.strokeCount += 1
 
             self.penCords = (x2, y2)
+            predictedX, predictedY = self.penFilter.predict(self.latency)
+            self.penPrediction = (round(predictedX), round(predictedY))
+        else:
+            self.penPrediction = None
 
         return self.canvas
 
     def startScanner(self):
         """
-        Starts the video capture for scanning.
+        Starts a scanning session on the camera with an empty canvas, without waiting for the device.
         """
 
-        self.video = cv2.VideoCapture(0)
-        self.video.set(3, self.frameWidth)
-        self.video.set(4, self.frameHeight)
-        self.video.set(100, 150)
-        self.canvas = np.zeros_like(self.video.read()[1])
+        self.camera.acquire()
+        self.canvas = None
+        self.penPrediction = None
+        self.pipeline.reset()
+        self.motionDetector.reset()
+        self.colorsMotionDetector.reset()
+        self.colorsRange = None
+        self.penFilter.reset()
 
     def stopScanner(self):
         """
-        Stops the video capture.
+        Stops the scanning session, the camera stays warm for the next one.
         """
 
-        cv2.destroyAllWindows()
-        self.video = None
+        self.camera.release()
 
     def getFinalImage(self):
         """
         Gets the final processed image with pen movements.
 
+        When the scene is still, page detection and pen search are skipped and the unchanged
+        canvas is returned, sceneChanged tells the caller whether new ink was drawn and
+        sceneMoving whether the camera scene is moving.
+
         Returns
         -------
-        :return np.ndarray
-            The final image with pen movements.
+        :return np.ndarray or None
+            The label canvas with pen movements, None until the camera delivered a frame.
+        """
+
+        self.pipeline.run('pen', 'record')
+        self.sceneMoving = self.pipeline.stages['motion'].changed
+        self.sceneChanged = self.pipeline.stages['pen'].changed
+        return self.pipeline.getOutput('pen')
+
+    def getComposedImage(self, screenshot: Image):
+        """
+        Gets the screenshot with the pen movements painted on it.
+
+        The image is only composed again when the canvas or the screenshot changed, sceneChanged
+        tells the caller whether it is a new one and sceneMoving whether the camera scene is moving.
+
+        Parameters
+        ----------
+        :param screenshot : Image
+            The RGB screenshot to paint on.
+
+        Returns
+        -------
+        :return np.ndarray or None
+            The composed RGB image, None until the camera delivered a frame.
+        """
+
+        self.pipeline.set('screenshot', screenshot)
+        self.pipeline.run('compose', 'record')
+        self.sceneMoving = self.pipeline.stages['motion'].changed
+        self.sceneChanged = self.pipeline.stages['compose'].changed
+        return self.pipeline.getOutput('compose')
+
+    def reportDisplayed(self):
+        """
+        Updates the latency after the frame of the last getFinalImage call was displayed.
         """
 
-        image = self.video.read()[1]
-        processedImage = self.processImage(image)
-        return self.getPenFromImage(processedImage)
+        sample = time.perf_counter() - self.captureTime
+        self.latency = sample if self.latency == 0 else self.latency + 0.1 * (sample - self.latency)
 
-    def getColorsImage(self, lower: np.ndarray, higher: np.ndarray):
+    def recordFrame(self, frame: np.ndarray):
+        """
+        Passes a captured frame with its tracking results to the recorder, if one is attached.
+
+        Parameters
+        ----------
+        :param frame : np.ndarray
+            The frame as read from the camera.
+        """
+
+        if self.recorder is not None:
+            self.recorder.write(frame, self.captureTime, self.oldCoordinates, self.penCords,
+                                time.perf_counter() - self.captureTime)
+
+    def getColorsImage(self, lower: np.ndarray, higher: np.ndarray, displaySize: tuple[int, int] | None = None):
         """
         Gets the image filtered by the specified HSV color range.
 
+        The frame is first scaled down to fit displaySize, and the filter is only recomputed when
+        the range changed or the scene moved since the previous call.
+
         Parameters
         ----------
         :param lower : np.ndarray
             Lower HSV color range.
         :param higher : np.ndarray
             Higher HSV color range.
+        :param displaySize : tuple[int, int] or None
+            Width and height the preview has to fit in(default full frame size)
+
+        Returns
+        -------
+        :return np.ndarray or None
+            The filtered image, None while the camera is not open or when the previous image is still valid.
         """
 
-        image = self.video.read()[1]
+        image = self.camera.read()
+        if image is None:
+            return None
+
+        scale = 1.0
+        if displaySize is not None:
+            scale = min(displaySize[0] / image.shape[1], displaySize[1] / image.shape[0], 1.0)
+        if scale < 1.0:
+            size = (max(int(image.shape[1] * scale), 1), max(int(image.shape[0] * scale), 1))
+            image = cv2.resize(image, size, dst=self.buffers.get('colorsFrame', (size[1], size[0], 3)),
+                               interpolation=cv2.INTER_AREA)
+        self.colorsFrame = image
+
+        moved = self.colorsMotionDetector.update(image)
+        if not moved and self.colorsRange is not None and \
+                np.array_equal(self.colorsRange[0], lower) and np.array_equal(self.colorsRange[1], higher):
+            return None
+        self.colorsRange = (np.array(lower), np.array(higher))
+
+        shape = image.shape[:2]
+        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV, dst=self.buffers.get('colorsHsv', image.shape))
+        mask = cv2.inRange(hsv, lower, higher, dst=self.buffers.get('colorsMask', shape))
+        return cv2.bitwise_and(image, image, mask=mask, dst=self.buffers.get('colors', image.shape))
+
+    def estimateColorRange(self, region: tuple[int, int, int, int], lowPercentile: float = 2,
+                           highPercentile: float = 98):
+        """
+        Estimates the HSV range of the pen from a region of the last preview frame.
 
-        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        res = cv2.bitwise_and(image, image, mask=cv2.inRange(hsv, lower, higher))
+        The percentiles of all three channels are read from their cumulative histograms at once.
+        Hue is not treated as circular, so samples of red pens crossing 0/179 give a wide hue range.
 
-        return res
+        Parameters
+        ----------
+        :param region : tuple[int, int, int, int]
+            Corners x0, y0, x1, y1 of the sample in preview coordinates.
+        :param lowPercentile : float
+            Percentile of the lower bound (default 2)
+        :param highPercentile : float
+            Percentile of the higher bound (default 98)
 
-    @staticmethod
-    def mergeImages(bottomLayer: Image, topLayer: Image):
+        Returns
+        -------
+        :return tuple[np.ndarray, np.ndarray] or None
+            Lower and higher HSV bounds, None when there is no preview frame or the region is empty.
         """
-        Merges two images with alpha blending.
+
+        if self.colorsFrame is None:
+            return None
+
+        x0, x1 = sorted((max(region[0], 0), max(region[2], 0)))
+        y0, y1 = sorted((max(region[1], 0), max(region[3], 0)))
+        sample = self.colorsFrame[y0:y1 + 1, x0:x1 + 1]
+        if sample.size == 0:
+            return None
+
+        hsv = cv2.cvtColor(sample, cv2.COLOR_BGR2HSV).reshape(-1, 3)
+        histograms = np.bincount((hsv + np.arange(3) * 256).ravel(), minlength=3 * 256).reshape(3, 256)
+        cumulative = np.cumsum(histograms, axis=1)
+
+        pixels = len(hsv)
+        lower = (cumulative < pixels * lowPercentile / 100).sum(axis=1)
+        higher = (cumulative < pixels * highPercentile / 100).sum(axis=1)
+        return lower, np.minimum(higher, [179, 255, 255])
+
+    def mergeImages(self, bottomLayer: Image, topLayer: np.ndarray):
+        """
+        Paints the ink of a canvas over an image.
+
+        The canvas is scaled to the image with nearest-neighbour interpolation, so labels are never
+        mixed, and the pixels of every label in inkLabels are replaced by its palette color through a
+        pooled mask and color plane, so no memory is allocated per frame; the rest of the image is
+        copied unchanged. The RGB array of the bottom layer is kept until a different bottom layer
+        is passed. When the top layer is the scanner canvas, the tail from the last inked point to
+        penPrediction is drawn on the merged image only.
 
         Parameters
         ----------
         :param bottomLayer : Image
-            The bottom image layer.
-        :param topLayer : Image
-            The top image layer.
+            The RGB bottom image layer.
+        :param topLayer : np.ndarray
+            The label canvas.
 
         Returns
         -------
         :return np.ndarray
-            The merged image with alpha blending.
+            The RGB image with the ink painted on it.
         """
 
-        bottomLayer = cv2.cvtColor(np.array(bottomLayer), cv2.COLOR_RGB2RGBA)
-        topLayer = cv2.cvtColor(np.array(topLayer), cv2.COLOR_RGB2RGBA)
-
-        topLayer = cv2.resize(topLayer, (bottomLayer.shape[1], bottomLayer.shape[0]))
-        return cv2.addWeighted(bottomLayer, 1, topLayer, 1, 0.0)
+        if bottomLayer is not self.mergeSource:
+            self.mergeBottom = np.asarray(bottomLayer.convert('RGB') if bottomLayer.mode != 'RGB' else bottomLayer)
+            self.mergeSource = bottomLayer
+        height, width = self.mergeBottom.shape[:2]
+
+        labels = topLayer
+        if labels.shape[:2] != (height, width):
+            labels = cv2.resize(labels, (width, height), dst=self.buffers.get('mergeLabels', (height, width)),
+                                interpolation=cv2.INTER_NEAREST)
+
+        merged = self.buffers.get('merge', (height, width, 3))
+        np.copyto(merged, self.mergeBottom)
+        mask = self.buffers.get('mergeMask', (height, width))
+        color = self.buffers.get('mergeColor', (height, width, 3))
+        for label in self.inkLabels:
+            cv2.compare(labels, label, cv2.CMP_EQ, dst=mask)
+            cv2.rectangle(color, (0, 0), (width, height), self.palette[label].tolist(), -1)
+            cv2.copyTo(color, mask, merged)
+
+        if self.penPrediction is not None and topLayer is self.canvas:
+            scaleX, scaleY = width / topLayer.shape[1], height / topLayer.shape[0]
+            cv2.line(merged, (round(self.penCords[0] * scaleX), round(self.penCords[1] * scaleY)),
+                     (round(self.penPrediction[0] * scaleX), round(self.penPrediction[1] * scaleY)),
+                     self.palette[INK_LABEL].tolist(), max(round(self.penThickness * scaleX), 1))
+        return merged
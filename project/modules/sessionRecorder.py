@@ -0,0 +1,329 @@
+import json
+import os
+import queue
+import threading
+import time
+import cv2
+import numpy as np
+
+FORMAT_VERSION = 1
+EVENT_DTYPE = np.dtype([('timestamp', '<f8'),  # seconds since the start of the recording
+                        ('offset', '<u8'),  # position of the JPEG chunk in frames.bin
+                        ('length', '<u4'),  # size of the JPEG chunk in bytes
+                        ('corners', '<f4', (4, 2)),  # page corners used for the warp, NaN when none
+                        ('pen', '<f4', (2,)),  # pen position on the canvas
+                        ('processingTime', '<f4')])  # seconds from capture to the finished canvas
+
+
+class SessionRecorder:
+    """
+    A class used to record the camera frames and tracking results of an edit session.
+
+    A recording is a directory holding frames.bin, the JPEG-compressed frames stored back to back,
+    events.bin, one EVENT_DTYPE record per frame, and meta.json. Both binary files can be memory
+    mapped. Frames are encoded and written on a background thread; when it falls behind, frames
+    are dropped instead of slowing the caller down.
+
+    Attributes
+    ----------
+    path : str
+        Directory of the recording
+    quality : int
+        JPEG quality of the frames (default 90)
+    queue : queue.Queue
+        Frames waiting for the writer thread (default maxsize 64)
+    droppedFrames : int
+        Number of frames dropped because the queue was full (default 0)
+    frameCount : int
+        Number of frames written (default 0)
+    frameSize : tuple[int, int] or None
+        Width and height of the recorded frames (default None)
+    startTime : float or None
+        Capture time of the first frame (default None)
+    writerThread : threading.Thread or None
+        Thread encoding and writing the frames (default None)
+
+    Methods
+    -------
+    start():
+        Creates the recording directory and starts the writer thread.
+    write(frame: np.ndarray, captureTime: float, corners, pen: tuple, processingTime: float):
+        Queues a frame with its tracking results, never blocks.
+    writeLoop():
+        Encodes and appends queued frames, runs on the writer thread.
+    writeMeta():
+        Writes meta.json.
+    stop():
+        Flushes the queue and closes the recording.
+    """
+
+    def __init__(self, path: str, quality: int = 90, queueSize: int = 64):
+        """
+        Parameters
+        ----------
+        :param path : str
+            Directory of the recording, created when missing.
+        :param quality : int
+            JPEG quality of the frames (default 90)
+        :param queueSize : int
+            Number of frames buffered for the writer thread (default 64)
+        """
+
+        self.path: str = path
+        self.quality: int = quality
+        self.queue: queue.Queue = queue.Queue(maxsize=queueSize)
+        self.droppedFrames: int = 0
+        self.frameCount: int = 0
+        self.frameSize: tuple[int, int] | None = None
+        self.startTime: float | None = None
+        self.writerThread: threading.Thread | None = None
+
+    def start(self):
+        """
+        Creates the recording directory and starts the writer thread.
+        """
+
+        os.makedirs(self.path, exist_ok=True)
+        self.writeMeta()
+        self.writerThread = threading.Thread(target=self.writeLoop, name="session-recorder", daemon=True)
+        self.writerThread.start()
+
+    def write(self, frame: np.ndarray, captureTime: float, corners, pen: tuple, processingTime: float):
+        """
+        Queues a frame with its tracking results, never blocks.
+
+        Parameters
+        ----------
+        :param frame : np.ndarray
+            The captured BGR frame, must not be modified afterwards.
+        :param captureTime : float
+            perf_counter value when the frame was captured.
+        :param corners : np.ndarray or list
+            Page corners used for the warp, empty when none were found yet.
+        :param pen : tuple
+            Pen position on the canvas.
+        :param processingTime : float
+            Seconds from capture to the finished canvas.
+        """
+
+        if self.startTime is None:
+            self.startTime = captureTime
+
+        try:
+            self.queue.put_nowait((captureTime - self.startTime, frame, corners, pen, processingTime))
+        except queue.Full:
+            self.droppedFrames += 1
+
+    def writeLoop(self):
+        """
+        Encodes and appends queued frames until stop() queues None, runs on the writer thread.
+        """
+
+        record = np.zeros(1, dtype=EVENT_DTYPE)
+        with open(os.path.join(self.path, 'frames.bin'), 'wb') as frames, \
+                open(os.path.join(self.path, 'events.bin'), 'wb') as events:
+            while (item := self.queue.get()) is not None:
+                timestamp, frame, corners, pen, processingTime = item
+                chunk = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])[1]
+
+                record['timestamp'] = timestamp
+                record['offset'] = frames.tell()
+                record['length'] = chunk.size
+                record['corners'] = np.reshape(corners, (4, 2)) if len(corners) else np.nan
+                record['pen'] = pen
+                record['processingTime'] = processingTime
+
+                frames.write(chunk.tobytes())
+                events.write(record.tobytes())
+                self.frameSize = (frame.shape[1], frame.shape[0])
+                self.frameCount += 1
+
+    def writeMeta(self):
+        """
+        Writes meta.json.
+        """
+
+        meta = {'version': FORMAT_VERSION,
+                'frameCount': self.frameCount,
+                'droppedFrames': self.droppedFrames,
+                'frameSize': self.frameSize,
+                'eventDtype': EVENT_DTYPE.descr}
+        with open(os.path.join(self.path, 'meta.json'), 'w') as file:
+            json.dump(meta, file, indent=2)
+
+    def stop(self):
+        """
+        Flushes the queue and closes the recording, also when the writer thread died.
+        """
+
+        if self.writerThread is None:
+            return
+
+        while self.writerThread.is_alive():
+            try:
+                self.queue.put(None, timeout=0.5)
+                break
+            except queue.Full:
+                continue
+        self.writerThread.join()
+        self.writerThread = None
+        self.writeMeta()
+
+
+class SessionPlayer:
+    """
+    A class used to replay a recording in place of the camera.
+
+    It offers the interface of CameraService, so a ScannerService created with a player as its
+    camera processes the recorded frames exactly like live ones.
+
+    Attributes
+    ----------
+    path : str
+        Directory of the recording
+    realtime : bool
+        Whether read() waits for the original frame timing, otherwise frames are returned as fast
+        as they are requested (default True)
+    meta : dict
+        Content of meta.json
+    events : np.ndarray
+        Memory-mapped EVENT_DTYPE records
+    frames : np.ndarray
+        Memory-mapped bytes of frames.bin
+    index : int
+        Index of the next frame (default 0)
+    startTime : float or None
+        perf_counter value the first frame was returned at (default None)
+    frameTime : float
+        Recorded capture time of the last returned frame on the perf_counter scale (default 0.0)
+
+    Methods
+    -------
+    getFrame(index: int):
+        Decodes a recorded frame.
+    read():
+        Returns the next frame, None at the end of the recording.
+    replay(scanner):
+        Feeds every frame through the scanner and yields the canvases.
+    open(), isOpened(), acquire(), release(), close():
+        CameraService interface, the recording is always open.
+    """
+
+    def __init__(self, path: str, realtime: bool = True):
+        self.path: str = path
+        self.realtime: bool = realtime
+
+        with open(os.path.join(path, 'meta.json')) as file:
+            self.meta: dict = json.load(file)
+
+        eventsPath = os.path.join(path, 'events.bin')
+        framesPath = os.path.join(path, 'frames.bin')
+        self.events: np.ndarray = np.memmap(eventsPath, dtype=EVENT_DTYPE, mode='r') \
+            if os.path.getsize(eventsPath) else np.zeros(0, dtype=EVENT_DTYPE)
+        self.frames: np.ndarray = np.memmap(framesPath, dtype=np.uint8, mode='r') \
+            if os.path.getsize(framesPath) else np.zeros(0, dtype=np.uint8)
+        self.index: int = 0
+        self.startTime: float | None = None
+        self.frameTime: float = 0.0
+
+    def __len__(self):
+        """
+        Returns the number of recorded frames.
+        """
+
+        return len(self.events)
+
+    def getFrame(self, index: int):
+        """
+        Decodes a recorded frame.
+
+        Parameters
+        ----------
+        :param index : int
+            Index of the frame.
+
+        Returns
+        -------
+        :return np.ndarray
+            The BGR frame.
+        """
+
+        event = self.events[index]
+        chunk = self.frames[event['offset']:event['offset'] + event['length']]
+        return cv2.imdecode(chunk, cv2.IMREAD_COLOR)
+
+    def read(self):
+        """
+        Returns the next frame, waiting for its original timing in realtime mode.
+
+        Returns
+        -------
+        :return np.ndarray or None
+            The BGR frame, None at the end of the recording.
+        """
+
+        if self.index >= len(self.events):
+            return None
+
+        if self.startTime is None:
+            self.startTime = time.perf_counter()
+
+        self.frameTime = self.startTime + float(self.events[self.index]['timestamp'])
+        if self.realtime:
+            time.sleep(max(self.frameTime - time.perf_counter(), 0))
+
+        frame = self.getFrame(self.index)
+        self.index += 1
+        return frame
+
+    def replay(self, scanner):
+        """
+        Feeds every frame through the scanner and yields the canvases.
+
+        Parameters
+        ----------
+        :param scanner : ScannerService
+            Scanner created with this player as its camera.
+
+        Returns
+        -------
+        :return Iterator[np.ndarray]
+            The label canvas after every recorded frame.
+        """
+
+        scanner.startScanner()
+        try:
+            while self.index < len(self.events):
+                yield scanner.getFinalImage()
+        finally:
+            scanner.stopScanner()
+
+    def open(self):
+        """
+        Does nothing, the recording is always open.
+        """
+
+    def isOpened(self):
+        """
+        Returns True, the recording is always open.
+        """
+
+        return True
+
+    def acquire(self):
+        """
+        Rewinds the recording for a new session.
+        """
+
+        self.index = 0
+        self.startTime = None
+
+    def release(self):
+        """
+        Does nothing, the recording is always open.
+        """
+
+    def close(self):
+        """
+        Does nothing, the memory maps are released with the player.
+        """
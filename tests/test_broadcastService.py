@@ -0,0 +1,82 @@
+import http.client
+import unittest
+import urllib.error
+import urllib.request
+import cv2
+import numpy as np
+from PIL import Image
+from project.modules.broadcastService import BroadcastService, BOUNDARY
+
+
+class BroadcastServiceTest(unittest.TestCase):
+    """
+    Checks the snapshot and MJPEG endpoints of a BroadcastService on localhost.
+    """
+
+    def setUp(self):
+        self.broadcast = BroadcastService(port=0)
+        self.broadcast.start()
+        self.addCleanup(self.broadcast.stop)
+        self.snapshotUrl = f"http://{self.broadcast.host}:{self.broadcast.port}/snapshot"
+
+    def publishAndWait(self, image):
+        sequence = self.broadcast.getFrame()[0]
+        self.broadcast.publish(image)
+        newSequence, jpeg = self.broadcast.waitForFrame(sequence, timeout=5.0)
+        self.assertIsNotNone(jpeg)
+        return newSequence
+
+    def testSnapshotBeforeFirstFrameIsUnavailable(self):
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            urllib.request.urlopen(self.snapshotUrl, timeout=5)
+        self.assertEqual(context.exception.code, 503)
+
+    def testSnapshotReturnsLatestFrame(self):
+        self.publishAndWait(Image.new('RGB', (64, 48), (255, 0, 0)))
+
+        with urllib.request.urlopen(self.snapshotUrl, timeout=5) as response:
+            self.assertEqual(response.headers['Content-Type'], 'image/jpeg')
+            frame = cv2.imdecode(np.frombuffer(response.read(), np.uint8), cv2.IMREAD_COLOR)
+
+        self.assertEqual(frame.shape, (48, 64, 3))
+        self.assertGreater(frame[24, 32, 2], 200)  # BGR, red channel
+        self.assertLess(frame[24, 32, 0], 50)
+
+    def testPublishedArraysAreCopied(self):
+        array = np.zeros((48, 64, 3), dtype=np.uint8)
+        array[:] = (0, 0, 255)
+        self.broadcast.publish(array)
+        array[:] = (0, 255, 0)
+        self.broadcast.waitForFrame(0, timeout=5.0)
+
+        frame = cv2.imdecode(np.frombuffer(self.broadcast.getFrame()[1], np.uint8), cv2.IMREAD_COLOR)
+        self.assertGreater(frame[24, 32, 0], 200)  # BGR, blue channel
+
+    def testStreamSendsMultipartFrames(self):
+        self.publishAndWait(Image.new('RGB', (64, 48), (0, 0, 255)))
+
+        connection = http.client.HTTPConnection(self.broadcast.host, self.broadcast.port, timeout=5)
+        self.addCleanup(connection.close)
+        connection.request('GET', '/stream')
+        response = connection.getresponse()
+        self.assertEqual(response.status, 200)
+        self.assertIn(f'boundary={BOUNDARY}', response.headers['Content-Type'])
+
+        self.assertEqual(response.fp.readline(), f'--{BOUNDARY}\r\n'.encode())
+        headers = {}
+        while (line := response.fp.readline().strip()):
+            name, value = line.decode().split(': ', 1)
+            headers[name] = value
+        self.assertEqual(headers['Content-Type'], 'image/jpeg')
+
+        jpeg = response.fp.read(int(headers['Content-Length']))
+        self.assertIsNotNone(cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR))
+
+    def testUnknownPathIsNotFound(self):
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            urllib.request.urlopen(f"http://{self.broadcast.host}:{self.broadcast.port}/other", timeout=5)
+        self.assertEqual(context.exception.code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import time
+import tracemalloc
+import unittest
+import cv2
+import numpy as np
+from PIL import Image
+from project.modules.scannerService import ScannerService
+
+FRAME_SIZE = (1280, 720)
+COLOR_VALUES = np.array([[18, 53, 0], [179, 255, 255]])
+
+
+class StubCamera:
+    """
+    A camera returning prepared frames in turn, so reading allocates nothing.
+    """
+
+    def __init__(self, frames: list):
+        self.frames: list = frames
+        self.index: int = 0
+        self.frameTime: float = 0.0
+
+    def read(self):
+        frame = self.frames[self.index % len(self.frames)]
+        self.index += 1
+        self.frameTime = time.perf_counter()
+        return frame
+
+    def acquire(self):
+        self.index = 0
+
+    def release(self):
+        pass
+
+
+def createFrames(width: int, height: int, count: int):
+    """
+    Draws a page with the pen at a different position in every frame.
+    """
+
+    frames = []
+    for i in range(count):
+        frame = np.full((height, width, 3), 40, dtype=np.uint8)
+        page = np.array([[width * 0.12, height * 0.10], [width * 0.90, height * 0.08],
+                         [width * 0.88, height * 0.92], [width * 0.10, height * 0.90]], dtype=np.int32)
+        cv2.fillPoly(frame, [page], (235, 235, 235))
+        cv2.circle(frame, (width // 3 + i * 40, height // 2), 20, (255, 0, 0), -1)
+        frames.append(frame)
+    return frames
+
+
+class ScannerServiceAllocationTest(unittest.TestCase):
+    """
+    Checks that the steady-state pipeline writes into pooled buffers instead of allocating frames.
+    """
+
+    warmupFrames = 10
+    measuredFrames = 30
+    maxBytesPerFrame = 64 * 1024  # a 1280x720 BGR frame is 2.7 MB
+
+    def setUp(self):
+        self.camera = StubCamera(createFrames(*FRAME_SIZE, 8))
+        self.scanner = ScannerService(COLOR_VALUES, camera=self.camera, frameSize=FRAME_SIZE)
+        self.screenshot = Image.new('RGB', FRAME_SIZE, (250, 250, 250))
+        self.scanner.startScanner()
+
+    def measureFrames(self, frames: int):
+        tracemalloc.start()
+        try:
+            peak = 0
+            for _ in range(frames):
+                start = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                self.scanner.getComposedImage(self.screenshot)
+                peak = max(peak, tracemalloc.get_traced_memory()[1] - start)
+            return peak
+        finally:
+            tracemalloc.stop()
+
+    def testComposedImageAllocatesNearZeroPerFrame(self):
+        for _ in range(self.warmupFrames):
+            self.scanner.getComposedImage(self.screenshot)
+
+        peak = self.measureFrames(self.measuredFrames)
+
+        self.assertTrue(self.scanner.sceneMoving)
+        self.assertGreater(self.scanner.strokeCount, 0)
+        self.assertLess(peak, self.maxBytesPerFrame)
+
+    def testMotionDetectorAllocatesNothingPerFrame(self):
+        frames = createFrames(*FRAME_SIZE, 2)
+        detector = self.scanner.motionDetector
+        for i in range(4):
+            detector.update(frames[i % 2])
+
+        tracemalloc.start()
+        try:
+            start = tracemalloc.get_traced_memory()[0]
+            for i in range(10):
+                detector.update(frames[i % 2])
+            peak = tracemalloc.get_traced_memory()[1] - start
+        finally:
+            tracemalloc.stop()
+
+        self.assertLess(peak, 4 * 1024)
+
+
+
+class ScannerServiceCompositionTest(unittest.TestCase):
+    """
+    Checks that the composed image is only renewed when the ink changes.
+    """
+
+    def testStillPenDoesNotRedraw(self):
+        camera = StubCamera(createFrames(*FRAME_SIZE, 1))
+        scanner = ScannerService(COLOR_VALUES, camera=camera, frameSize=FRAME_SIZE)
+        screenshot = Image.new('RGB', FRAME_SIZE, (250, 250, 250))
+        scanner.startScanner()
+
+        results = []
+        for _ in range(6):
+            scanner.getComposedImage(screenshot)
+            results.append((scanner.sceneMoving, scanner.sceneChanged))
+
+        self.assertEqual(results[0], (True, True))
+        self.assertEqual(results[2:], [(True, False)] * 4)  # settle frames poll but do not redraw
+        self.assertEqual(scanner.strokeCount, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
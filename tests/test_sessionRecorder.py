@@ -0,0 +1,56 @@
+import tempfile
+import threading
+import unittest
+import numpy as np
+from project.modules.sessionRecorder import SessionRecorder, SessionPlayer
+
+
+class SessionRecorderTest(unittest.TestCase):
+    """
+    Checks recording round trips and stopping a recorder whose writer died.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def testRecordedFramesAreReplayed(self):
+        recorder = SessionRecorder(self.directory.name)
+        recorder.start()
+        for i in range(3):
+            recorder.write(np.full((48, 64, 3), i * 80, dtype=np.uint8), i / 30, [], (i, i), 0.01)
+        recorder.stop()
+
+        player = SessionPlayer(self.directory.name, realtime=False)
+        self.assertEqual(len(player), 3)
+        self.assertEqual(player.meta['frameSize'], [64, 48])
+        self.assertAlmostEqual(int(player.getFrame(2).mean()), 160, delta=2)
+        self.assertTrue(np.isnan(player.events[0]['corners']).all())
+
+    def testStopReturnsWhenWriterDied(self):
+        recorder = SessionRecorder(self.directory.name, queueSize=2)
+        recorder.start()
+        recorder.queue.put(None)  # ends the writer thread like a failed write would
+        recorder.writerThread.join()
+        for i in range(3):
+            recorder.write(np.zeros((48, 64, 3), dtype=np.uint8), i / 30, [], (0, 0), 0.0)
+
+        stopper = threading.Thread(target=recorder.stop, daemon=True)
+        stopper.start()
+        stopper.join(timeout=5)
+
+        self.assertFalse(stopper.is_alive())
+        self.assertEqual(recorder.droppedFrames, 1)
+
+    def testEmptyRecordingHasNoFrames(self):
+        recorder = SessionRecorder(self.directory.name)
+        recorder.start()
+        recorder.stop()
+
+        player = SessionPlayer(self.directory.name, realtime=False)
+        self.assertEqual(len(player), 0)
+        self.assertIsNone(player.read())
+
+
+if __name__ == '__main__':
+    unittest.main()